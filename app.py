@@ -1,18 +1,17 @@
 import streamlit as st
-import feedparser
-import os.path
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-import pickle
 import time
-from datetime import datetime
-import uuid
-import json
-import base64
+from collections import deque
+from itertools import islice
+from datetime import datetime, timedelta
+import os
+import urllib.request
 import pandas as pd
-from models import SessionLocal, RSSFeed
+from streamlit_autorefresh import st_autorefresh
+import google_client
+import metrics
+import repository
+import search_index
+from models import SINKS, SINK_DATABASE, ROTATIONS, ROTATE_ROWS, ROTATE_NEVER, BREAKER_CLOSED
 
 # Configuração da página
 st.set_page_config(
@@ -21,14 +20,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# Função para obter sessão do banco de dados
-def get_db():
-    db = SessionLocal()
-    try:
-        return db
-    finally:
-        db.close()
-
 # Título principal
 st.title("📰 Monitor de Feed RSS para Google Sheets")
 
@@ -40,250 +31,357 @@ nome = st.sidebar.text_input("Nome do Monitor", key="nome")
 feed_rss = st.sidebar.text_input("URL do Feed RSS", key="feed_rss")
 sheet_id = st.sidebar.text_input("ID da Planilha Google Sheets", key="sheet_id")
 
-# Área de logs
-if 'logs' not in st.session_state:
-    st.session_state.logs = []
+# Destino das entradas: planilha, tabelas locais (video/creator) ou ambos
+SINK_LABELS = {'sheets': 'Planilha', 'database': 'Banco de dados', 'both': 'Planilha e banco de dados'}
+sink = st.sidebar.selectbox("Destino", SINKS, format_func=SINK_LABELS.get, key="sink")
+
+# Rotação da aba ativa da planilha: as abas antigas vão para o arquivo
+ROTATION_LABELS = {'never': 'Nunca', 'monthly': 'Uma aba por mês', 'rows': 'Após N linhas'}
+rotation_policy = st.sidebar.selectbox("Rotação da aba", ROTATIONS, format_func=ROTATION_LABELS.get, key="rotation")
+rotation_max_rows = None
+archive_sheet_id = None
+if rotation_policy == ROTATE_ROWS:
+    rotation_max_rows = int(st.sidebar.number_input(
+        "Linhas por aba", min_value=1000, value=100000, step=1000, key="rotation_max_rows"
+    ))
+if rotation_policy != ROTATE_NEVER:
+    archive_sheet_id = st.sidebar.text_input(
+        "ID da planilha de arquivo (vazio: a aba antiga fica na planilha)", key="archive_sheet_id"
+    ) or None
+
+# Estado do circuito de erros de cada feed (ver circuit_breaker)
+BREAKER_LABELS = {'closed': 'Fechado', 'open': 'Aberto', 'half_open': 'Meio-aberto (em teste)'}
+
+# Quantidade máxima de logs mantidos em memória
+LOG_BUFFER_SIZE = 500
+
+# Quantidade de logs exibidos na página
+LOG_DISPLAY_SIZE = 50
+
+# Intervalo da atualização automática do painel (em segundos)
+REFRESH_INTERVAL = 30
+
+# Tempo (em segundos) que o estado dos monitores fica em cache
+STATUS_TTL = 10
+
+# Endpoint /metrics do worker (ex.: http://worker:9100/metrics)
+METRICS_URL = os.getenv('METRICS_URL')
+
+@st.cache_resource
+def get_log_buffer():
+    """Buffer circular de logs compartilhado pelas sessões (memória constante)."""
+    return deque(maxlen=LOG_BUFFER_SIZE)
 
 def add_log(message):
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    st.session_state.logs.insert(0, f"[{current_time}] {message}")
+    get_log_buffer().appendleft(f"[{current_time}] {message}")
 
 # Função para salvar feed no banco de dados
-def save_feed_to_db(nome, feed_url, sheet_id):
+def save_feed_to_db(nome, feed_url, sheet_id, sink, rotation_policy=ROTATE_NEVER,
+                    rotation_max_rows=None, archive_sheet_id=None):
     try:
-        db = get_db()
-        feed = RSSFeed(
-            id=str(uuid.uuid4()),
-            name=nome,
-            feed_url=feed_url,
-            sheet_id=sheet_id,
-            is_active=True,
-            last_check=datetime.utcnow()
+        feed_id = repository.create_feed(
+            nome, feed_url, sheet_id, sink, rotation_policy, rotation_max_rows, archive_sheet_id
         )
-        db.add(feed)
-        db.commit()
         add_log(f"✅ Feed '{nome}' salvo no banco de dados com sucesso!")
-        return True
+        return feed_id
     except Exception as e:
         add_log(f"❌ Erro ao salvar feed no banco de dados: {str(e)}")
-        return False
+        return None
 
-# Função para atualizar último check do feed
-def update_feed_last_check(feed_id):
-    try:
-        db = get_db()
-        feed = db.query(RSSFeed).filter(RSSFeed.id == feed_id).first()
-        if feed:
-            feed.last_check = datetime.utcnow()
-            db.commit()
-    except Exception as e:
-        add_log(f"❌ Erro ao atualizar último check: {str(e)}")
+# Atividade recente do worker (novos itens, erros de escrita), gravada por ele no banco
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def get_worker_events(limit=LOG_DISPLAY_SIZE):
+    return [f"[{event.created_at:%Y-%m-%d %H:%M:%S} UTC] {event.message}" for event in repository.recent_events(limit)]
 
-# Função para listar feeds ativos
-def get_active_feeds():
-    try:
-        db = get_db()
-        feeds = db.query(RSSFeed).filter(RSSFeed.is_active == True).all()
-        return feeds
-    except Exception as e:
-        add_log(f"❌ Erro ao buscar feeds ativos: {str(e)}")
-        return []
-
-# Função para processar o feed
-def process_feed(rss_url):
-    feed = feedparser.parse(rss_url)
-    entries = []
-    for entry in feed.entries:
-        # Extrai a data e formata
-        published_date = entry.get('published', '')
-        try:
-            if published_date:
-                date_obj = datetime.strptime(published_date, '%a, %d %b %Y %H:%M:%S %z')
-                formatted_date = date_obj.strftime('%Y-%m-%d %H:%M:%S')
-            else:
-                formatted_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        except Exception:
-            formatted_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        # Gera UUID único para cada entrada
-        entry_uuid = str(uuid.uuid4())
-        
-        # Extrai informações
-        video_link = entry.get('link', '')
-        title = entry.get('title', '')
-        user = entry.get('author', '')
-        if not user and 'author' in entry:
-            user = entry['author']
-        if not user:
-            user = ''
-
-        row = [
-            formatted_date,
-            entry_uuid,
-            video_link,
-            title,
-            user
-        ]
-        entries.append(row)
-    
-    return entries
-
-def get_google_credentials():
-    creds = None
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-    
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+# Função para listar o estado dos monitores
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def get_feeds_status():
+    """Lê do banco o estado de todos os monitores e quantos itens cada um já gravou."""
+    counts = repository.count_seen_entries()
+    now = datetime.utcnow()
+    rows = []
+    for feed in repository.list_feeds():
+        if not feed.is_active and feed.consecutive_errors:
+            status = "⛔ Desativado por erros"
+        elif not feed.is_active:
+            status = "⏸️ Pausado"
+        elif feed.breaker_state and feed.breaker_state != BREAKER_CLOSED:
+            status = "🔌 Com erros"
+        elif feed.next_check and feed.next_check < now - timedelta(minutes=5):
+            status = "⚠️ Atrasado"
         else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', ['https://www.googleapis.com/auth/spreadsheets'])
-            creds = flow.run_local_server(port=0)
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
-    
-    return creds
-
-def update_sheet(service, spreadsheet_id, values):
-    try:
-        # Verifica cabeçalho
-        result = service.spreadsheets().values().get(
-            spreadsheetId=spreadsheet_id,
-            range='A1:E1'
-        ).execute()
-        
-        if 'values' not in result:
-            headers = [['DATA', 'UUID', 'VIDEO', 'TITLE', 'USER']]
-            service.spreadsheets().values().append(
-                spreadsheetId=spreadsheet_id,
-                range='A1',
-                valueInputOption='USER_ENTERED',
-                insertDataOption='INSERT_ROWS',
-                body={'values': headers}
-            ).execute()
-
-        # Adiciona valores
-        body = {
-            'values': values
+            status = "✅ Ativo"
+        rows.append({
+            'Status': status,
+            'Nome': feed.name,
+            'Feed': feed.feed_url,
+            'Destino': SINK_LABELS.get(feed.sink, feed.sink),
+            'Planilha': feed.sheet_id,
+            'Rotação': ROTATION_LABELS.get(feed.rotation_policy or ROTATE_NEVER, feed.rotation_policy),
+            'Itens': counts.get(feed.id, 0),
+            'Última verificação (UTC)': feed.last_check,
+            'Próxima verificação (UTC)': feed.next_check,
+            'Circuito': BREAKER_LABELS.get(feed.breaker_state or BREAKER_CLOSED, feed.breaker_state),
+            'Erros seguidos': feed.consecutive_errors or 0,
+            'Último erro': feed.last_error,
+        })
+    return pd.DataFrame(rows)
+
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def get_disabled_feeds():
+    """Feeds desativados por erros seguidos: {id: nome}."""
+    return {feed.id: feed.name for feed in repository.list_feeds() if not feed.is_active and feed.consecutive_errors}
+
+@st.cache_resource(show_spinner=False)
+def get_sheets_service():
+    """Service do Sheets compartilhado por todas as sessões do app.
+
+    O token é renovado em segundo plano antes de expirar, então as
+    interações na página não pagam autenticação nem descoberta da API.
+    """
+    service = google_client.get_sheets_service(interactive=True)
+    google_client.start_token_refresher()
+    return service
+
+# Função para resumir as métricas do worker
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def get_worker_metrics(url):
+    """Lê o /metrics do worker e resume por feed e por operação."""
+    with urllib.request.urlopen(url, timeout=3) as response:
+        text = response.read().decode('utf-8')
+    feed_summary, operation_summary = metrics.summarize(metrics.parse_metrics(text))
+    names = {feed.id: feed.name for feed in repository.list_feeds()}
+
+    feeds_df = pd.DataFrame([
+        {
+            'Nome': names.get(feed_id, feed_id),
+            'Verificações': int(row['fetches']),
+            '304 (%)': round(100 * row['not_modified_rate'], 1),
+            'Compartilhadas': int(row['shared']),
+            'Erros': int(row['errors']),
+            'Download + parse (ms)': round(row['fetch_ms'], 1),
+            'Parse XML (ms)': round(row['feed_parse_ms'], 1),
+            'Linhas novas (ms)': round(row['parse_ms'], 1),
+            'KB baixados': round(row['bytes'] / 1024, 1),
+            'Entradas vistas': int(row['entries_seen']),
+            'Entradas novas': int(row['entries_new']),
         }
-        result = service.spreadsheets().values().append(
-            spreadsheetId=spreadsheet_id,
-            range='A2',
-            valueInputOption='USER_ENTERED',
-            insertDataOption='INSERT_ROWS',
-            body=body
-        ).execute()
-        add_log(f'✅ {len(values)} novos itens adicionados à planilha!')
-        return result
-    except Exception as e:
-        add_log(f'❌ Erro ao atualizar planilha: {str(e)}')
-        return None
+        for feed_id, row in feed_summary.items()
+    ])
+    if not feeds_df.empty:
+        feeds_df = feeds_df.sort_values('Download + parse (ms)', ascending=False)
+    operations_df = pd.DataFrame([
+        {
+            'Operação': key,
+            'Chamadas': int(row['calls']),
+            'Média (ms)': round(row['average_ms'], 1),
+            'Erros': int(row['errors']),
+        }
+        for key, row in sorted(operation_summary.items())
+    ])
+    return feeds_df, operations_df
+
+# Resultados por página na busca de entradas
+SEARCH_PAGE_SIZE = 50
 
-def get_existing_feeds(service, spreadsheet_id):
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def search_entries(query, feed_ids, author, since, until, page):
+    """Busca no índice local de entradas (sem chamar a API do Sheets)."""
+    started = time.perf_counter()
+    results, total = search_index.search(
+        query, feed_ids, author, since, until, page=page, page_size=SEARCH_PAGE_SIZE
+    )
+    names = {feed.id: feed.name for feed in repository.list_feeds()}
+    df = pd.DataFrame([
+        {
+            'Data (UTC)': result.published_at,
+            'Título': result.title,
+            'Autor': result.author,
+            'Link': result.link,
+            'Feed': names.get(result.feed_id, result.feed_id),
+        }
+        for result in results
+    ])
+    return df, total, (time.perf_counter() - started) * 1000
+
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def get_search_authors():
+    return search_index.top_authors()
+
+# Linhas por página na tabela de feeds existentes
+PAGE_SIZE = 100
+
+# Tempo (em segundos) que uma página fica em cache antes de sincronizar de novo
+MIRROR_TTL = 60
+
+@st.cache_data(ttl=MIRROR_TTL, show_spinner=False)
+def load_existing_feeds_page(_service, spreadsheet_id, page, page_size):
+    """Sincroniza a cópia local da planilha e retorna uma página e o total de linhas."""
+    # Importado aqui: só o painel da planilha usa o cliente do Sheets
+    import sheet_mirror
+    sheet_mirror.sync(_service, spreadsheet_id)
+    rows = sheet_mirror.read_page(spreadsheet_id, page, page_size)
+    return pd.DataFrame(rows, columns=sheet_mirror.COLUMNS), sheet_mirror.row_count(spreadsheet_id)
+
+def get_existing_feeds(service, spreadsheet_id, page=0, page_size=PAGE_SIZE):
     try:
-        result = service.spreadsheets().values().get(
-            spreadsheetId=spreadsheet_id,
-            range='A:E'
-        ).execute()
-        
-        if 'values' in result:
-            values = result['values']
-            if len(values) > 1:  # Se houver mais que apenas o cabeçalho
-                df = pd.DataFrame(values[1:], columns=values[0])
-                return df
-        return pd.DataFrame(columns=['DATA', 'UUID', 'VIDEO', 'TITLE', 'USER'])
+        return load_existing_feeds_page(service, spreadsheet_id, page, page_size)
     except Exception as e:
         add_log(f'❌ Erro ao buscar feeds existentes: {str(e)}')
-        return pd.DataFrame(columns=['DATA', 'UUID', 'VIDEO', 'TITLE', 'USER'])
+        return pd.DataFrame(), 0
 
-# Layout em duas colunas
-col1, col2 = st.columns([1, 1])
+def show_existing_feeds(service, spreadsheet_id):
+    """Mostra a tabela de feeds existentes com paginação."""
+    total = get_existing_feeds(service, spreadsheet_id)[1]
+    if not total:
+        st.info("Nenhum feed encontrado ainda.")
+        return
+    pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+    page = st.number_input("Página", min_value=1, max_value=pages, value=1, step=1, key="existing_page")
+    df, total = get_existing_feeds(service, spreadsheet_id, page - 1)
+    st.caption(f"{total} itens no total, página {page} de {pages} (mais recentes primeiro)")
+    st.dataframe(df, use_container_width=True)
 
-# Área principal
+# Cadastro de um novo monitor: o worker passa a verificá-lo na próxima recarga
 if st.sidebar.button("Iniciar Monitoramento", key="start"):
-    if not nome or not feed_rss or not sheet_id:
+    if not nome or not feed_rss or (not sheet_id and sink != SINK_DATABASE):
         st.error("Por favor, preencha todos os campos!")
+    elif save_feed_to_db(nome, feed_rss, sheet_id, sink, rotation_policy, rotation_max_rows, archive_sheet_id):
+        add_log(f"📡 Monitor '{nome}' será verificado pelo worker em instantes.")
+        get_feeds_status.clear()
+
+# Cadastro em lote a partir de um OPML ou CSV (mesmos padrões de planilha e destino do formulário)
+with st.sidebar.expander("📥 Importar feeds (OPML/CSV)"):
+    uploaded = st.file_uploader(
+        "Arquivo .opml ou .csv (colunas name, feed_url, sheet_id, sink)", type=["opml", "xml", "csv"], key="import_file"
+    )
+    validate = st.checkbox("Baixar os feeds para validar", value=True, key="import_validate")
+    if uploaded is not None and st.button("Importar", key="import"):
+        # Importado aqui: só a importação usa o parser de OPML/CSV
+        import feed_import
+        try:
+            with st.spinner("Validando e cadastrando feeds..."):
+                results = feed_import.import_feeds(
+                    feed_import.parse_file(uploaded.getvalue(), uploaded.name), sheet_id, sink, validate=validate
+                )
+            counts = feed_import.summarize(results)
+            add_log(f"📥 Importação de '{uploaded.name}': {counts.get(feed_import.CREATED, 0)} feeds cadastrados, "
+                    f"{len(results) - counts.get(feed_import.CREATED, 0)} ignorados.")
+            get_feeds_status.clear()
+            st.session_state["import_report"] = pd.DataFrame(
+                [{'Linha': r.line, 'Situação': r.status, 'Nome': r.name, 'Feed': r.feed_url, 'Detalhe': r.message}
+                 for r in results]
+            )
+        except Exception as e:
+            add_log(f"❌ Erro ao importar feeds: {str(e)}")
+            st.error(f"Erro ao importar feeds: {str(e)}")
+
+auto_refresh = st.sidebar.checkbox(
+    f"Atualização automática ({REFRESH_INTERVAL}s)", value=True, key="auto_refresh"
+)
+if auto_refresh:
+    # O timer roda no navegador: o script termina logo e cliques e campos
+    # respondem na hora, sem uma thread dormindo por aba aberta
+    st_autorefresh(interval=REFRESH_INTERVAL * 1000, key="auto_refresh_timer")
+
+# Estado dos monitores, lido do banco
+st.write("### Monitores")
+try:
+    status_df = get_feeds_status()
+    if not status_df.empty:
+        st.dataframe(status_df, use_container_width=True)
+    else:
+        st.info("Nenhum monitor cadastrado ainda.")
+except Exception as e:
+    st.error(f"Erro ao carregar monitores: {str(e)}")
+
+# Relatório da última importação em lote desta sessão
+if "import_report" in st.session_state:
+    with st.expander("📥 Relatório da importação", expanded=True):
+        st.dataframe(st.session_state["import_report"], use_container_width=True)
+
+# Feeds desativados pelo circuito de erros podem ser reativados aqui
+try:
+    disabled = get_disabled_feeds()
+except Exception as e:
+    disabled = {}
+    add_log(f"❌ Erro ao carregar feeds desativados: {str(e)}")
+if disabled:
+    with st.expander(f"⛔ Feeds desativados por erros ({len(disabled)})"):
+        feed_to_enable = st.selectbox("Feed", list(disabled), format_func=disabled.get, key="feed_to_enable")
+        if st.button("Reativar", key="reactivate"):
+            try:
+                repository.reactivate_feed(feed_to_enable)
+                add_log(f"🔁 Feed '{disabled[feed_to_enable]}' reativado.")
+                get_feeds_status.clear()
+                get_disabled_feeds.clear()
+            except Exception as e:
+                add_log(f"❌ Erro ao reativar feed: {str(e)}")
+
+# Resumo das métricas do worker por etapa
+with st.expander("📈 Métricas do worker"):
+    if not METRICS_URL:
+        st.info("Defina a variável METRICS_URL com o endereço do /metrics do worker.")
     else:
         try:
-            # Salva o feed no banco de dados
-            if save_feed_to_db(nome, feed_rss, sheet_id):
-                # Inicializa credenciais do Google
-                add_log("🔑 Autenticando com Google Sheets...")
-                creds = get_google_credentials()
-                service = build('sheets', 'v4', credentials=creds)
-                
-                # Inicializa conjunto para rastrear entradas processadas
-                processed_entries = set()
-                
-                # Container para logs em tempo real
-                with col1:
-                    log_container = st.empty()
-                
-                # Container para feeds existentes
-                with col2:
-                    feeds_container = st.empty()
-                
-                while True:
-                    try:
-                        entries = process_feed(feed_rss)
-                        new_entries = []
-                        
-                        for entry in entries:
-                            entry_id = entry[2]  # Usa o link como identificador
-                            if entry_id not in processed_entries:
-                                new_entries.append(entry)
-                                processed_entries.add(entry_id)
-                        
-                        if new_entries:
-                            update_sheet(service, sheet_id, new_entries)
-                        
-                        # Atualiza último check no banco
-                        update_feed_last_check(feed_rss)
-                        
-                        # Atualiza logs na interface
-                        with log_container.container():
-                            st.write("### Logs do Sistema")
-                            for log in st.session_state.logs[:50]:  # Mostra últimos 50 logs
-                                st.text(log)
-                        
-                        # Atualiza feeds existentes
-                        with feeds_container.container():
-                            st.write("### Feeds Existentes")
-                            df = get_existing_feeds(service, sheet_id)
-                            if not df.empty:
-                                st.dataframe(df, use_container_width=True)
-                            else:
-                                st.info("Nenhum feed encontrado ainda.")
-                        
-                        time.sleep(300)  # Verifica a cada 5 minutos
-                        
-                    except Exception as e:
-                        add_log(f"❌ Erro durante a execução: {str(e)}")
-                        time.sleep(60)
-                    
+            feeds_df, operations_df = get_worker_metrics(METRICS_URL)
+            st.write("Por feed (desde o início do worker)")
+            st.dataframe(feeds_df, use_container_width=True)
+            st.write("Sheets e banco de dados")
+            st.dataframe(operations_df, use_container_width=True)
         except Exception as e:
-            st.error(f"Erro ao iniciar monitoramento: {str(e)}")
+            st.error(f"Erro ao carregar métricas do worker: {str(e)}")
+
+# Busca nas entradas já processadas, com filtros e paginação no servidor
+st.write("### Buscar entradas")
+try:
+    feed_names = {feed.id: feed.name for feed in repository.list_feeds()}
+    search_col, feed_col, author_col = st.columns([2, 2, 1])
+    query = search_col.text_input("Título ou autor", key="search_query")
+    feed_ids = feed_col.multiselect("Feeds", list(feed_names), format_func=feed_names.get, key="search_feeds")
+    author = author_col.selectbox("Autor", [''] + get_search_authors(), format_func=lambda a: a or "(todos)",
+                                  key="search_author")
+    since = until = None
+    if st.checkbox("Filtrar por data", key="search_by_date"):
+        date_from, date_to = st.columns(2)
+        since = datetime.combine(date_from.date_input("De", value=datetime.utcnow().date() - timedelta(days=30),
+                                                      key="search_since"), datetime.min.time())
+        until = datetime.combine(date_to.date_input("Até", key="search_until"), datetime.min.time()) + timedelta(days=1)
+    search_page = st.number_input("Página", min_value=1, value=1, step=1, key="search_page")
+    results_df, total, elapsed_ms = search_entries(query, tuple(feed_ids), author, since, until, search_page - 1)
+    shown = f"mais de {search_index.COUNT_LIMIT:,}" if total > search_index.COUNT_LIMIT else f"{total:,}"
+    st.caption(f"{shown} entradas encontradas ({elapsed_ms:.0f} ms), página {search_page}")
+    if not results_df.empty:
+        st.dataframe(results_df, use_container_width=True)
+except Exception as e:
+    st.error(f"Erro ao buscar entradas: {str(e)}")
+
+# Layout em duas colunas
+col1, col2 = st.columns([1, 1])
 
-# Layout inicial em duas colunas
 with col1:
-    st.write("### Logs do Sistema")
-    for log in st.session_state.logs[:50]:
+    st.write("### Atividade do Worker")
+    try:
+        worker_events = get_worker_events()
+        for event in worker_events:
+            st.text(event)
+        if not worker_events:
+            st.info("Nenhuma atividade do worker registrada ainda.")
+    except Exception as e:
+        st.error(f"Erro ao carregar a atividade do worker: {str(e)}")
+
+    st.write("### Logs do Painel")
+    for log in islice(get_log_buffer(), LOG_DISPLAY_SIZE):
         st.text(log)
 
 with col2:
     st.write("### Feeds Existentes")
     if sheet_id:
         try:
-            creds = get_google_credentials()
-            service = build('sheets', 'v4', credentials=creds)
-            df = get_existing_feeds(service, sheet_id)
-            if not df.empty:
-                st.dataframe(df, use_container_width=True)
-            else:
-                st.info("Nenhum feed encontrado ainda.")
+            service = get_sheets_service()
+            show_existing_feeds(service, sheet_id)
         except Exception as e:
             st.error(f"Erro ao carregar feeds existentes: {str(e)}")
     else:
-        st.info("Insira o ID da planilha para visualizar os feeds existentes.") 
\ No newline at end of file
+        st.info("Insira o ID da planilha para visualizar os feeds existentes.")
@@ -0,0 +1,328 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+_VALUES_PATH = re.compile(r'^/v4/spreadsheets/([^/]+)/values/([^:?]+)(:append)?$')
+_SPREADSHEET_PATH = re.compile(r'^/v4/spreadsheets/([^/:]+)(:batchUpdate)?$')
+_COPY_PATH = re.compile(r'^/v4/spreadsheets/([^/]+)/sheets/(\d+):copyTo$')
+_CELLS = re.compile(r'^([A-Z]+)(\d+)?(?::([A-Z]+)(\d+)?)?$')
+
+def _split_range(value):
+    """Separa "'aba'!A2:E" em ('aba', 'A2:E'); sem aba, retorna (None, 'A2:E') (primeira aba)."""
+    if '!' in value:
+        tab, cells = value.rsplit('!', 1)
+        if tab.startswith("'"):
+            tab = tab[1:-1].replace("''", "'")
+        return tab, cells
+    return None, value
+
+def _column(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+def _bounds(cells):
+    """Linhas e colunas (inclusive, a partir de 1; None = até o fim) de um intervalo A1."""
+    match = _CELLS.match(cells)
+    if not match:
+        return (1, None), (1, None)
+    first_col, first_row, last_col, last_row = match.groups()
+    rows = (int(first_row) if first_row else 1, int(last_row) if last_row else None)
+    if last_col:
+        columns = (_column(first_col), _column(last_col))
+    elif first_row:
+        columns = (_column(first_col), None)  # "A2": da célula até o fim da linha
+    else:
+        columns = (_column(first_col), _column(first_col))  # coluna inteira, como "B"
+    return rows, columns
+
+class FakeSheets:
+    """Planilhas em memória que imitam as chamadas da API usadas pelo projeto.
+
+    Suporta values.get/append/update, spreadsheets.get (abas),
+    batchUpdate (addSheet, deleteSheet, updateSheetProperties) e
+    sheets.copyTo. Range sem aba usa a primeira aba da planilha.
+    """
+
+    def __init__(self):
+        self.tabs = {}  # (spreadsheet_id, aba) -> lista de linhas
+        self.sheets = {}  # spreadsheet_id -> propriedades das abas, na ordem
+        self.calls = {}  # nome da chamada -> quantidade
+        self.added_sheets = 0  # abas criadas por batchUpdate (addSheet)
+        self._next_sheet_id = 1
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def _add_sheet(self, spreadsheet_id, title, index=None):
+        sheets = self.sheets.setdefault(spreadsheet_id, [])
+        if any(sheet['title'] == title for sheet in sheets):
+            raise ValueError(f'A sheet with the name "{title}" already exists.')
+        properties = {'sheetId': self._next_sheet_id, 'title': title}
+        self._next_sheet_id += 1
+        sheets.insert(len(sheets) if index is None else index, properties)
+        for position, sheet in enumerate(sheets):
+            sheet['index'] = position
+        self.tabs[(spreadsheet_id, title)] = []
+        return dict(properties)
+
+    def _tab(self, spreadsheet_id, tab):
+        # Planilha nova começa com uma aba, como no Google Sheets
+        if not self.sheets.get(spreadsheet_id):
+            self._add_sheet(spreadsheet_id, 'Sheet1')
+        return tab or self.sheets[spreadsheet_id][0]['title']
+
+    def get(self, spreadsheet_id, value_range):
+        tab, cells = _split_range(value_range)
+        (first, last), (first_col, last_col) = _bounds(cells)
+        with self._lock:
+            tab = self._tab(spreadsheet_id, tab)
+            rows = self.tabs.get((spreadsheet_id, tab), [])
+            selected = [row[first_col - 1:last_col] for row in rows[first - 1:last]]
+        # Como a API, corta as linhas vazias do fim
+        while selected and not any(selected[-1]):
+            selected.pop()
+        response = {'range': f"'{tab}'!{cells}", 'majorDimension': 'ROWS'}
+        if selected:
+            response['values'] = selected
+        return response
+
+    def append(self, spreadsheet_id, value_range, values):
+        tab, _ = _split_range(value_range)
+        with self._lock:
+            tab = self._tab(spreadsheet_id, tab)
+            rows = self.tabs.setdefault((spreadsheet_id, tab), [])
+            first = len(rows) + 1
+            rows.extend(values)
+            last = len(rows)
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'updates': {
+                'spreadsheetId': spreadsheet_id,
+                'updatedRange': f"'{tab}'!A{first}:E{last}",
+                'updatedRows': len(values),
+            },
+        }
+
+    def update(self, spreadsheet_id, value_range, values):
+        tab, cells = _split_range(value_range)
+        (first, _), _ = _bounds(cells)
+        with self._lock:
+            tab = self._tab(spreadsheet_id, tab)
+            rows = self.tabs.setdefault((spreadsheet_id, tab), [])
+            rows.extend([] for _ in range(first - 1 + len(values) - len(rows)))
+            for offset, row in enumerate(values):
+                rows[first - 1 + offset] = list(row)
+        return {'spreadsheetId': spreadsheet_id, 'updatedRange': value_range, 'updatedRows': len(values)}
+
+    def metadata(self, spreadsheet_id):
+        with self._lock:
+            self._tab(spreadsheet_id, None)
+            return {
+                'spreadsheetId': spreadsheet_id,
+                'sheets': [{'properties': dict(sheet)} for sheet in self.sheets[spreadsheet_id]],
+            }
+
+    def batch_update(self, spreadsheet_id, requests):
+        replies = []
+        with self._lock:
+            self._tab(spreadsheet_id, None)
+            sheets = self.sheets[spreadsheet_id]
+            for request in requests:
+                if 'addSheet' in request:
+                    properties = request['addSheet'].get('properties', {})
+                    added = self._add_sheet(spreadsheet_id, properties['title'], properties.get('index'))
+                    self.added_sheets += 1
+                    replies.append({'addSheet': {'properties': added}})
+                elif 'deleteSheet' in request:
+                    sheet = next(s for s in sheets if s['sheetId'] == request['deleteSheet']['sheetId'])
+                    sheets.remove(sheet)
+                    del self.tabs[(spreadsheet_id, sheet['title'])]
+                    replies.append({})
+                elif 'updateSheetProperties' in request:
+                    properties = request['updateSheetProperties']['properties']
+                    sheet = next(s for s in sheets if s['sheetId'] == properties['sheetId'])
+                    if 'title' in properties:
+                        self.tabs[(spreadsheet_id, properties['title'])] = self.tabs.pop((spreadsheet_id, sheet['title']))
+                        sheet['title'] = properties['title']
+                    if 'index' in properties:
+                        sheets.remove(sheet)
+                        sheets.insert(properties['index'], sheet)
+                        for position, item in enumerate(sheets):
+                            item['index'] = position
+                    replies.append({})
+                else:
+                    raise ValueError(f'Unsupported request: {list(request)}')
+        return {'spreadsheetId': spreadsheet_id, 'replies': replies}
+
+    def copy_to(self, spreadsheet_id, sheet_id, destination_id):
+        with self._lock:
+            sheet = next(s for s in self.sheets[spreadsheet_id] if s['sheetId'] == sheet_id)
+            rows = [list(row) for row in self.tabs[(spreadsheet_id, sheet['title'])]]
+            self._tab(destination_id, None)
+            copy = self._add_sheet(destination_id, f"Cópia de {sheet['title']}")
+            self.tabs[(destination_id, copy['title'])] = rows
+        return copy
+
+    def duplicate_rows(self):
+        """Linhas com UUID (coluna B) repetido na mesma aba."""
+        with self._lock:
+            duplicates = 0
+            for rows in self.tabs.values():
+                ids = [row[1] for row in rows[1:] if len(row) > 1]
+                duplicates += len(ids) - len(set(ids))
+            return duplicates
+
+    def extra_header_rows(self):
+        """Linhas de cabeçalho (UUID na coluna B) depois da primeira linha de cada aba."""
+        with self._lock:
+            return sum(
+                1 for rows in self.tabs.values() for row in rows[1:] if len(row) > 1 and row[1] == 'UUID'
+            )
+
+    def rows(self, spreadsheet_id, tab=None):
+        with self._lock:
+            tab = self._tab(spreadsheet_id, tab)
+            return list(self.tabs.get((spreadsheet_id, tab), []))
+
+class _SheetsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        return json.loads(self._raw_body or b'{}')
+
+    def _handle(self, method):
+        server = self.server
+        sheets = server.sheets
+        # Lê o corpo antes de qualquer resposta: na conexão keep-alive, um
+        # corpo não lido seria interpretado como a próxima requisição
+        self._raw_body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and server.random.random() < server.error_rate:
+            sheets.count('429')
+            self._reply(429, {'error': {'code': 429, 'message': 'Quota exceeded', 'status': 'RESOURCE_EXHAUSTED'}})
+            return
+
+        path = urlparse(self.path).path
+        values = _VALUES_PATH.match(path)
+        spreadsheet = _SPREADSHEET_PATH.match(path)
+        copy = _COPY_PATH.match(path)
+        try:
+            if values:
+                spreadsheet_id, value_range, append = values.group(1), unquote(values.group(2)), values.group(3)
+                if method == 'GET' and not append:
+                    sheets.count('get')
+                    self._reply(200, sheets.get(spreadsheet_id, value_range))
+                elif method in ('PUT', 'POST') and (method == 'POST') == bool(append):
+                    if append:
+                        sheets.count('append')
+                        result = sheets.append(spreadsheet_id, value_range, self._body().get('values', []))
+                    else:
+                        sheets.count('update')
+                        result = sheets.update(spreadsheet_id, value_range, self._body().get('values', []))
+                    if server.lost_reply_rate and server.random.random() < server.lost_reply_rate:
+                        # A escrita foi aplicada, mas o cliente recebe um erro
+                        sheets.count('lost_reply')
+                        self._reply(503, {'error': {'code': 503, 'message': 'Backend error', 'status': 'UNAVAILABLE'}})
+                        return
+                    self._reply(200, result)
+                else:
+                    self._reply(400, {'error': {'code': 400, 'message': 'Unsupported call'}})
+            elif spreadsheet and method == 'GET' and not spreadsheet.group(2):
+                sheets.count('metadata')
+                self._reply(200, sheets.metadata(spreadsheet.group(1)))
+            elif spreadsheet and method == 'POST' and spreadsheet.group(2):
+                sheets.count('batch_update')
+                self._reply(200, sheets.batch_update(spreadsheet.group(1), self._body().get('requests', [])))
+            elif copy and method == 'POST':
+                sheets.count('copy_to')
+                destination = self._body().get('destinationSpreadsheetId')
+                self._reply(200, sheets.copy_to(copy.group(1), int(copy.group(2)), destination))
+            else:
+                self._reply(404, {'error': {'code': 404, 'message': 'Not found'}})
+        except (ValueError, KeyError, StopIteration) as e:
+            self._reply(400, {'error': {'code': 400, 'message': str(e), 'status': 'INVALID_ARGUMENT'}})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeSheetsServer(ThreadingHTTPServer):
+    """Substituto local da API do Sheets, com latência e erros 429 configuráveis.
+
+    `lost_reply_rate` simula escritas (append e update) aplicadas cuja resposta se perde (503).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, error_rate=0.0, lost_reply_rate=0.0, host='127.0.0.1', port=0, seed=42):
+        super().__init__((host, port), _SheetsHandler)
+        self.sheets = FakeSheets()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.lost_reply_rate = lost_reply_rate
+        self.random = random.Random(seed)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def build_service(self):
+        """Cliente googleapiclient apontado para este servidor (sem autenticação).
+
+        Como no google_client, cada thread usa a sua conexão (httplib2 não é
+        thread-safe e a fila de escrita grava várias planilhas em paralelo).
+        """
+        import httplib2
+        from googleapiclient.discovery import build
+        from googleapiclient.http import HttpRequest
+
+        local = threading.local()
+
+        def thread_http():
+            if not hasattr(local, 'http'):
+                local.http = httplib2.Http()
+            return local.http
+
+        return build(
+            'sheets', 'v4',
+            http=thread_http(),
+            requestBuilder=lambda http, *args, **kwargs: HttpRequest(thread_http(), *args, **kwargs),
+            cache_discovery=False,
+            static_discovery=True,
+            client_options={'api_endpoint': self.base_url},
+        )
@@ -0,0 +1,109 @@
+"""Mede o tempo de import (cold start) dos pontos de entrada com `python -X importtime`.
+
+Cada alvo roda em um processo novo, várias vezes, e o relatório mostra o
+menor tempo total de import e os módulos mais pesados da melhor rodada.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.importtime --repeat 5
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def script_imports(path):
+    """Monta o código que repete os imports do topo de um script."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        modules.extend(name for name in names if name not in modules)
+    return 'import ' + ', '.join(modules)
+
+# Alvo -> código executado no processo novo
+TARGETS = {
+    'models': 'import models',
+    'manage': 'import manage',
+    'worker': 'import worker',
+    # O app.py só roda dentro do Streamlit; mede os imports do topo do script,
+    # lidos do próprio app.py para a lista não ficar desatualizada
+    'app': script_imports(os.path.join(ROOT, 'app.py')),
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='rodadas por alvo (vale a menor)')
+    parser.add_argument('--top', type=int, default=5, help='módulos mais pesados exibidos por alvo')
+    parser.add_argument('--json', action='store_true', help='imprime o relatório em JSON')
+    return parser.parse_args(argv)
+
+def parse_importtime(stderr):
+    """Lê a saída do -X importtime em uma lista de (módulo, próprio_us, acumulado_us, nível)."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(own), int(cumulative), level))
+    return modules
+
+def measure(code, env):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = parse_importtime(result.stderr)
+    # Descarta o que foi importado na inicialização do interpretador (até o `site`)
+    names = [name for name, _, _, _ in modules]
+    if 'site' in names:
+        modules = modules[names.index('site') + 1:]
+    total = sum(cumulative for _, _, cumulative, level in modules if level == 0)
+    return total, modules
+
+def bench_target(code, env, repeat, top):
+    best_total, best_modules = None, []
+    for _ in range(repeat):
+        total, modules = measure(code, env)
+        if best_total is None or total < best_total:
+            best_total, best_modules = total, modules
+    heaviest = sorted(
+        ((name, cumulative) for name, _, cumulative, level in best_modules if level == 1),
+        key=lambda item: item[1], reverse=True,
+    )[:top]
+    return {
+        'import_ms': best_total / 1000,
+        'heaviest': [{'module': name, 'ms': cumulative / 1000} for name, cumulative in heaviest],
+    }
+
+def main(argv=None):
+    args = parse_args(argv)
+    env = dict(os.environ)
+    # SQLite temporário: medir o import não deve depender do banco real
+    env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='feed-rss-import-'), 'import.db')}")
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+
+    report = {name: bench_target(code, env, args.repeat, args.top) for name, code in TARGETS.items()}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, result in report.items():
+            print(f"\n== {name}: {result['import_ms']:,.1f} ms")
+            for item in result['heaviest']:
+                print(f"  {item['module']:<40} {item['ms']:,.1f} ms")
+    return report
+
+if __name__ == '__main__':
+    main()
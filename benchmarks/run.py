@@ -0,0 +1,257 @@
+"""Benchmark offline do pipeline feed -> deduplicação -> planilha.
+
+Sobe um servidor local com feeds sintéticos e um substituto da API do
+Sheets, e mede process_feed(), update_sheet() e ciclos completos do worker.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.run --feeds 200 --cycles 5
+"""
+import argparse
+import gzip
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--feeds', type=int, default=100, help='quantidade de feeds sintéticos')
+    parser.add_argument('--size', type=int, default=50, help='entradas por documento')
+    parser.add_argument('--new-per-tick', type=int, default=2, help='entradas novas por feed atualizado')
+    parser.add_argument('--update-fraction', type=float, default=0.2, help='fração dos feeds atualizados por ciclo')
+    parser.add_argument('--kind', choices=['rss', 'atom'], default='rss', help='formato dos feeds')
+    parser.add_argument('--sheets', type=int, default=5, help='quantidade de planilhas de destino')
+    parser.add_argument('--subscribers', type=int, default=1, help='monitores por feed (mesma URL, planilhas diferentes)')
+    parser.add_argument('--sink', choices=['sheets', 'database', 'both'], default='sheets', help='destino das entradas')
+    parser.add_argument('--rotate-rows', type=int, default=0,
+                        help='troca a aba da planilha a cada N linhas (0: sem rotação)')
+    parser.add_argument('--cycles', type=int, default=5, help='ciclos completos do worker')
+    parser.add_argument('--workers', type=int, default=16, help='threads do worker')
+    parser.add_argument('--latency', type=float, default=0.0, help='latência da API falsa do Sheets (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fração de respostas 429 da API falsa')
+    parser.add_argument('--lost-reply-rate', type=float, default=0.0,
+                        help='fração de appends aplicados que respondem 503 (testa a reconciliação)')
+    parser.add_argument('--database-url', default=None, help='banco usado no benchmark (padrão: SQLite temporário)')
+    parser.add_argument('--json', action='store_true', help='imprime o relatório em JSON')
+    return parser.parse_args(argv)
+
+def setup_environment(args):
+    """Configura o ambiente antes de importar os módulos do projeto."""
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix='feed-rss-bench-'), 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    # A cota real não se aplica ao servidor falso; os 429 são injetados por --error-rate
+    os.environ['SHEETS_WRITES_PER_MINUTE'] = '1000000'
+    os.environ['SHEETS_READS_PER_MINUTE'] = '1000000'
+    os.environ.setdefault('SHEET_MIRROR_DIR', tempfile.mkdtemp(prefix='feed-rss-mirror-'))
+    os.environ.setdefault('SHEET_ARCHIVE_DIR', tempfile.mkdtemp(prefix='feed-rss-archive-'))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+def peak_rss_mb():
+    # No Linux ru_maxrss vem em KB; no macOS, em bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def bench_process_feed(feed_server, args):
+    """Baixa e interpreta documentos completos com process_feed()."""
+    from feeds import process_feed
+
+    sample = range(min(args.feeds, 50))
+    latencies = []
+    entries = 0
+    for feed_no in sample:
+        started = time.perf_counter()
+        entries += len(process_feed(feed_server.feed_url(feed_no, args.kind)))
+        latencies.append(time.perf_counter() - started)
+    elapsed = sum(latencies)
+    return {
+        'documents': len(latencies),
+        'entries_per_sec': entries / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+def bench_update_sheet(sheets_server, args):
+    """Grava lotes de linhas com update_sheet() no servidor falso."""
+    from rss_to_sheets import update_sheet
+
+    service = sheets_server.build_service()
+    sheets = sheets_server.sheets
+    calls_before = sheets.total_calls()
+    latencies = []
+    rows_written = 0
+    for batch in range(20):
+        rows = [
+            ['2024-01-01 00:00:00', f'uuid-{batch}-{i}', f'https://example.com/{batch}/{i}', 'Título', 'Canal']
+            for i in range(args.new_per_tick * 5)
+        ]
+        started = time.perf_counter()
+        if update_sheet(service, 'bench-update-sheet', rows) is not None:
+            rows_written += len(rows)
+        latencies.append(time.perf_counter() - started)
+    calls = sheets.total_calls() - calls_before
+    return {
+        'calls': len(latencies),
+        'rows_written': rows_written,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'api_calls_per_entry': calls / rows_written if rows_written else 0.0,
+    }
+
+def _video_rows():
+    from models import session_scope, Video
+    with session_scope() as db:
+        return db.query(Video).count()
+
+def _sheet_rows(sheets):
+    # Desconta a linha de cabeçalho de cada aba; abas arquivadas (apagadas
+    # da planilha) ficam de fora, então com --rotate-rows conta as exportadas
+    archive_dir = os.environ['SHEET_ARCHIVE_DIR']
+    archived = 0
+    for directory, _, files in os.walk(archive_dir):
+        for name in files:
+            with gzip.open(os.path.join(directory, name), 'rt') as file:
+                archived += max(sum(1 for _ in file) - 1, 0)
+    with sheets._lock:
+        return archived + sum(max(len(rows) - 1, 0) for rows in sheets.tabs.values())
+
+def bench_cycles(synthetic, feed_server, sheets_server, args):
+    """Executa ciclos completos do worker: busca, deduplicação e escrita."""
+    import models
+    import repository
+    import worker
+    from feeds import SharedFetcher
+    from models import ROTATE_NEVER, ROTATE_ROWS
+    from sheets_sink import SheetsSink
+
+    models.init_db()
+    for feed_no in range(args.feeds):
+        for subscriber in range(args.subscribers):
+            repository.create_feed(
+                f'bench-{feed_no}-{subscriber}', feed_server.feed_url(feed_no, args.kind),
+                f'bench-sheet-{(feed_no + subscriber) % args.sheets}', args.sink,
+                rotation_policy=ROTATE_ROWS if args.rotate_rows else ROTATE_NEVER,
+                rotation_max_rows=args.rotate_rows or None,
+            )
+
+    service = sheets_server.build_service()
+    sink = SheetsSink(lambda: service)
+    sheets = sheets_server.sheets
+    # Entradas gravadas no destino principal (planilha, ou tabela video)
+    stored_rows = _video_rows if args.sink == 'database' else lambda: _sheet_rows(sheets)
+
+    cycles = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for cycle in range(args.cycles):
+            if cycle:
+                synthetic.advance()
+            # Os ciclos rodam em sequência, sem esperar o tempo real entre eles:
+            # cada ciclo começa sem documentos guardados de ciclos anteriores
+            worker.fetcher = SharedFetcher()
+            feeds = repository.list_active_feeds()
+            worker.fetcher.set_subscribers(feed.feed_url for feed in feeds)
+            calls_before = sheets.total_calls()
+            rows_before = stored_rows()
+            requests_before = feed_server.requests
+            bytes_before = feed_server.bytes_sent
+            not_modified_before = feed_server.not_modified
+
+            started = time.perf_counter()
+            list(executor.map(worker._safe_poll, repeat(sink), feeds))
+            while sink.pending_rows():
+                sink.flush(force=True)
+            worker.feed_updates.flush()
+            worker.events.flush(worker.WORKER_ID)
+            elapsed = time.perf_counter() - started
+
+            requests = feed_server.requests - requests_before
+            cycles.append({
+                'cycle': cycle,
+                'seconds': elapsed,
+                'feeds': len(feeds),
+                'upstream_requests': requests,
+                'upstream_kb': (feed_server.bytes_sent - bytes_before) / 1024,
+                'new_entries': stored_rows() - rows_before,
+                'api_calls': sheets.total_calls() - calls_before,
+                'not_modified_rate': (feed_server.not_modified - not_modified_before) / requests if requests else 0.0,
+            })
+
+    # O primeiro ciclo grava o histórico inteiro; os seguintes medem o regime normal
+    warm = cycles[1:] or cycles
+    seconds = sum(c['seconds'] for c in warm)
+    new_entries = sum(c['new_entries'] for c in warm)
+    latencies = [c['seconds'] for c in warm]
+    return {
+        'cold_cycle_seconds': cycles[0]['seconds'],
+        'cold_entries': cycles[0]['new_entries'],
+        'feeds_per_sec': sum(c['feeds'] for c in warm) / seconds if seconds else 0.0,
+        'entries_per_sec': new_entries / seconds if seconds else 0.0,
+        'p50_cycle_ms': percentile(latencies, 0.5) * 1000,
+        'p99_cycle_ms': percentile(latencies, 0.99) * 1000,
+        'api_calls_per_new_entry': sum(c['api_calls'] for c in warm) / new_entries if new_entries else 0.0,
+        'not_modified_rate': sum(c['not_modified_rate'] for c in warm) / len(warm),
+        'upstream_kb_per_cycle': sum(c['upstream_kb'] for c in warm) / len(warm),
+        'duplicate_rows': sheets.duplicate_rows(),
+        'extra_header_rows': sheets.extra_header_rows(),
+        'rotations': sheets.added_sheets,
+        'requests_per_monitor': sum(c['upstream_requests'] for c in cycles) / sum(c['feeds'] for c in cycles),
+        'cycles': cycles,
+    }
+
+def print_report(report):
+    print('\n== process_feed()')
+    for key, value in report['process_feed'].items():
+        print(f'  {key:<26} {value:,.2f}')
+    print('\n== update_sheet()')
+    for key, value in report['update_sheet'].items():
+        print(f'  {key:<26} {value:,.2f}')
+    print('\n== ciclo completo do worker')
+    for key, value in report['cycle'].items():
+        if key != 'cycles':
+            print(f'  {key:<26} {value:,.2f}')
+    print(f"\n== pico de memória (RSS): {report['peak_rss_mb']:,.1f} MB")
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_environment(args)
+
+    from benchmarks.synthetic_feeds import SyntheticFeeds, FeedServer
+    from benchmarks.fake_sheets import FakeSheetsServer
+
+    synthetic = SyntheticFeeds(args.feeds, args.size, args.new_per_tick, args.update_fraction)
+    feed_server = FeedServer(synthetic).start()
+    sheets_server = FakeSheetsServer(
+        latency=args.latency, error_rate=args.error_rate, lost_reply_rate=args.lost_reply_rate
+    ).start()
+
+    try:
+        report = {
+            'process_feed': bench_process_feed(feed_server, args),
+            'update_sheet': bench_update_sheet(sheets_server, args),
+            'cycle': bench_cycles(synthetic, feed_server, sheets_server, args),
+        }
+    finally:
+        feed_server.shutdown()
+        sheets_server.shutdown()
+    report['peak_rss_mb'] = peak_rss_mb()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return report
+
+if __name__ == '__main__':
+    main()
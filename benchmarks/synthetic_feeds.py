@@ -0,0 +1,169 @@
+import gzip
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+# Data da primeira entrada de cada feed sintético
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Intervalo entre publicações das entradas sintéticas
+PUBLISH_GAP = timedelta(minutes=30)
+
+def _item_date(index):
+    return EPOCH + index * PUBLISH_GAP
+
+def generate_rss(feed_no, newest, size):
+    """Documento RSS 2.0 com as `size` entradas mais recentes até `newest`."""
+    items = []
+    for index in range(newest, max(newest - size, -1), -1):
+        items.append(
+            '<item>'
+            f'<title>{escape(f"Vídeo {index} do feed {feed_no}")}</title>'
+            f'<link>https://example.com/feeds/{feed_no}/videos/{index}</link>'
+            f'<guid isPermaLink="false">feed-{feed_no}-item-{index}</guid>'
+            f'<pubDate>{format_datetime(_item_date(index))}</pubDate>'
+            f'<author>canal{feed_no}@example.com (Canal {feed_no})</author>'
+            f'<description>{"Lorem ipsum dolor sit amet. " * 10}</description>'
+            '</item>'
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0"><channel>'
+        f'<title>Feed sintético {feed_no}</title>'
+        f'<link>https://example.com/feeds/{feed_no}</link>'
+        '<description>Feed gerado para benchmark</description>'
+        + ''.join(items) +
+        '</channel></rss>'
+    )
+
+def generate_atom(feed_no, newest, size):
+    """Documento Atom com as `size` entradas mais recentes até `newest`."""
+    entries = []
+    for index in range(newest, max(newest - size, -1), -1):
+        entries.append(
+            '<entry>'
+            f'<title>{escape(f"Vídeo {index} do feed {feed_no}")}</title>'
+            f'<link rel="alternate" href="https://example.com/feeds/{feed_no}/videos/{index}"/>'
+            f'<id>urn:feed:{feed_no}:item:{index}</id>'
+            f'<published>{_item_date(index).isoformat()}</published>'
+            f'<updated>{_item_date(index).isoformat()}</updated>'
+            f'<author><name>Canal {feed_no}</name></author>'
+            f'<summary>{"Lorem ipsum dolor sit amet. " * 10}</summary>'
+            '</entry>'
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom">'
+        f'<title>Feed sintético {feed_no}</title>'
+        f'<id>urn:feed:{feed_no}</id>'
+        f'<updated>{_item_date(newest).isoformat()}</updated>'
+        + ''.join(entries) +
+        '</feed>'
+    )
+
+class SyntheticFeeds:
+    """Estado dos feeds sintéticos: quantas entradas cada um já publicou.
+
+    A cada `advance()`, os feeds sorteados pela `update_fraction` publicam
+    `new_per_tick` entradas novas; os demais continuam iguais e respondem
+    304 a um GET condicional.
+    """
+
+    def __init__(self, feeds=100, size=50, new_per_tick=2, update_fraction=0.2, seed=42):
+        self.size = size
+        self.new_per_tick = new_per_tick
+        self.update_fraction = update_fraction
+        self._random = random.Random(seed)
+        self._newest = [size - 1] * feeds
+        self._versions = [0] * feeds
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._newest)
+
+    def advance(self):
+        """Publica entradas novas em parte dos feeds e retorna quantas foram criadas."""
+        created = 0
+        with self._lock:
+            for feed_no in range(len(self._newest)):
+                if self._random.random() < self.update_fraction:
+                    self._newest[feed_no] += self.new_per_tick
+                    self._versions[feed_no] += 1
+                    created += self.new_per_tick
+        return created
+
+    def document(self, feed_no, kind='rss'):
+        """Retorna (ETag, corpo) do feed no estado atual."""
+        with self._lock:
+            newest = self._newest[feed_no]
+            version = self._versions[feed_no]
+        generate = generate_atom if kind == 'atom' else generate_rss
+        return f'"{feed_no}-{version}"', generate(feed_no, newest, self.size).encode('utf-8')
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        # Caminhos aceitos: /rss/<n>.xml e /atom/<n>.xml
+        parts = self.path.strip('/').split('/')
+        try:
+            kind = parts[0]
+            feed_no = int(parts[1].split('.')[0])
+            etag, body = self.server.feeds.document(feed_no, kind)
+        except (IndexError, ValueError):
+            self.send_error(404)
+            return
+
+        self.server.requests += 1
+        if self.headers.get('If-None-Match') == etag:
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        content_type = 'application/atom+xml' if kind == 'atom' else 'application/rss+xml'
+        compress = 'gzip' in self.headers.get('Accept-Encoding', '')
+        if compress:
+            body = gzip.compress(body, compresslevel=5)
+        self.server.bytes_sent += len(body)
+        self.send_response(200)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class FeedServer(ThreadingHTTPServer):
+    """Servidor HTTP local que serve os feeds sintéticos."""
+
+    daemon_threads = True
+
+    def __init__(self, feeds, host='127.0.0.1', port=0):
+        super().__init__((host, port), _FeedHandler)
+        self.feeds = feeds
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def feed_url(self, feed_no, kind='rss'):
+        return f'{self.base_url}/{kind}/{feed_no}.xml'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
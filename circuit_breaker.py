@@ -0,0 +1,64 @@
+import os
+import random
+from datetime import datetime, timedelta
+from models import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN
+from scheduler import ERROR_RETRY_INTERVAL, MAX_POLL_INTERVAL
+
+# Espera máxima entre tentativas de um feed com erro (em segundos); a
+# primeira espera é ERROR_RETRY_INTERVAL e dobra a cada erro seguido
+BREAKER_MAX_DELAY = int(os.getenv('BREAKER_MAX_DELAY', str(MAX_POLL_INTERVAL)))
+
+# Erros seguidos que abrem o circuito (o feed passa a ser testado só depois do backoff)
+BREAKER_OPEN_AFTER = int(os.getenv('BREAKER_OPEN_AFTER', '3'))
+
+# Erros seguidos que desativam o feed (is_active = False); 0 nunca desativa
+FEED_DEACTIVATE_AFTER = int(os.getenv('FEED_DEACTIVATE_AFTER', '20'))
+
+# Tamanho máximo da mensagem de erro guardada no banco
+MAX_ERROR_LENGTH = 500
+
+def backoff_delay(errors, rng=random):
+    """Espera (em segundos) depois de `errors` erros seguidos.
+
+    Backoff exponencial com jitter: um valor sorteado entre metade e o
+    total do intervalo, para que feeds que caíram juntos (o mesmo host)
+    não voltem a ser testados todos no mesmo instante.
+    """
+    delay = min(ERROR_RETRY_INTERVAL * 2 ** max(errors - 1, 0), BREAKER_MAX_DELAY)
+    return rng.uniform(delay / 2, delay)
+
+def describe(error):
+    message = f'{type(error).__name__}: {error}'
+    return message[:MAX_ERROR_LENGTH]
+
+def on_failure(feed, error, now=None):
+    """Colunas do RSSFeed a gravar depois de uma verificação com erro.
+
+    Com BREAKER_OPEN_AFTER erros seguidos o circuito abre; uma falha no
+    teste (meio-aberto) o mantém aberto, com espera maior. Com
+    FEED_DEACTIVATE_AFTER erros seguidos o feed é desativado.
+    """
+    now = now or datetime.utcnow()
+    errors = (feed.consecutive_errors or 0) + 1
+    values = {
+        'consecutive_errors': errors,
+        'last_error': describe(error),
+        'breaker_state': BREAKER_OPEN if errors >= BREAKER_OPEN_AFTER else BREAKER_CLOSED,
+        'next_check': now + timedelta(seconds=backoff_delay(errors)),
+    }
+    if FEED_DEACTIVATE_AFTER and errors >= FEED_DEACTIVATE_AFTER:
+        values['is_active'] = False
+    return values
+
+def on_success(feed):
+    """Colunas a gravar depois de uma verificação bem-sucedida (None se nada mudou).
+
+    O último erro fica registrado para consulta no painel.
+    """
+    if not feed.consecutive_errors and (feed.breaker_state or BREAKER_CLOSED) == BREAKER_CLOSED:
+        return None
+    return {'consecutive_errors': 0, 'breaker_state': BREAKER_CLOSED}
+
+def is_probe(feed):
+    """Indica se a verificação do feed é o teste de um circuito aberto."""
+    return feed.breaker_state in (BREAKER_OPEN, BREAKER_HALF_OPEN)
@@ -0,0 +1,88 @@
+import re
+import time
+from datetime import datetime, timezone
+
+# Formato da coluna DATA na planilha (sempre em UTC)
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Formatos tentados quando o feedparser não consegue interpretar a data
+KNOWN_FORMATS = (
+    '%a, %d %b %Y %H:%M:%S %z',
+    '%a, %d %b %Y %H:%M:%S %Z',
+    '%a, %d %b %Y %H:%M %z',
+    '%d %b %Y %H:%M:%S %z',
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%Y-%m-%dT%H:%M:%S.%f%z',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d',
+)
+
+# Formato que funcionou para cada "forma" de data já vista (dígitos e
+# palavras normalizados), para não testar todos os formatos a cada item
+_format_by_shape = {}
+_SHAPE = re.compile(r'\d|[A-Za-z]{2,}')
+
+def _shape(value):
+    return _SHAPE.sub(lambda m: '0' if m.group().isdigit() else 'a', value)
+
+def _strptime_utc(value, fmt):
+    parsed = datetime.strptime(value, fmt)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)  # 'GMT'/'UTC' ou sem fuso
+    return parsed.astimezone(timezone.utc)
+
+def parse_date(value):
+    """Interpreta uma data textual com os formatos conhecidos; retorna None se falhar."""
+    value = value.strip()
+    shape = _shape(value)
+    fmt = _format_by_shape.get(shape)
+    if fmt is not None:
+        try:
+            return _strptime_utc(value, fmt)
+        except ValueError:
+            pass
+    elif shape in _format_by_shape:
+        return None  # Forma já conhecida e que nenhum formato interpreta
+
+    for fmt in KNOWN_FORMATS:
+        try:
+            parsed = _strptime_utc(value, fmt)
+        except ValueError:
+            continue
+        _format_by_shape[shape] = fmt
+        return parsed
+
+    _format_by_shape.setdefault(shape, None)
+    return None
+
+def entry_timestamp(entry):
+    """Data da entrada como struct_time em UTC, ou None se não houver data válida."""
+    # O feedparser já interpreta RSS, Atom e ISO-8601 nos campos *_parsed
+    for field in ('published_parsed', 'updated_parsed'):
+        parsed = entry.get(field)
+        if parsed:
+            return parsed
+
+    for field in ('published', 'updated'):
+        raw = entry.get(field)
+        if raw:
+            parsed = parse_date(raw)
+            if parsed is not None:
+                return parsed.utctimetuple()
+    return None
+
+def format_entry_date(entry, default=None):
+    """Formata a data da entrada para a coluna DATA; usa `default` se não houver data."""
+    timestamp = entry_timestamp(entry)
+    if timestamp is None:
+        return default if default is not None else now_formatted()
+    return time.strftime(DATE_FORMAT, timestamp)
+
+def format_entry_dates(entries):
+    """Formata as datas de várias entradas de uma vez (o horário atual é calculado uma vez só)."""
+    now = now_formatted()
+    return [format_entry_date(entry, now) for entry in entries]
+
+def now_formatted():
+    return datetime.now(timezone.utc).strftime(DATE_FORMAT)
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from models import session_scope, SeenEntry, insert_ignore
+import metrics
+
+# Quantidade máxima de entradas mantidas no cache em memória
+SEEN_CACHE_SIZE = int(os.getenv('SEEN_CACHE_SIZE', '100000'))
+
+# Tamanho máximo de cada lote nas consultas e inserções
+BATCH_SIZE = 500
+
+def hash_entry_key(key):
+    """SHA-1 do guid/link da entrada, usado como chave no banco."""
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+class SeenEntryIndex:
+    """Índice persistente das entradas já processadas, por feed.
+
+    As chaves ficam na tabela seen_entry, então um restart não gera
+    escritas duplicadas. Um cache LRU limitado fica na frente do banco para
+    que o caminho comum (entradas já vistas recentemente) não faça consultas
+    e a memória do processo não cresça com o tempo.
+    """
+
+    def __init__(self, max_size=SEEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, item):
+        with self._lock:
+            if item in self._cache:
+                self._cache.move_to_end(item)
+                return True
+            return False
+
+    def _remember(self, items):
+        with self._lock:
+            for item in items:
+                self._cache[item] = None
+                self._cache.move_to_end(item)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def _query_known(self, feed_id, hashes):
+        """Consulta em lote quais hashes já estão gravados para o feed."""
+        known = set()
+        with metrics.DB_SECONDS.time(operation='seen_keys'), session_scope() as db:
+            for chunk in _chunks(list(hashes)):
+                rows = db.query(SeenEntry.entry_hash).filter(
+                    SeenEntry.feed_id == feed_id,
+                    SeenEntry.entry_hash.in_(chunk)
+                ).all()
+                known.update(row[0] for row in rows)
+        return known
+
+    def seen_keys(self, feed_id, keys):
+        """Retorna o subconjunto de `keys` que já foi processado para o feed."""
+        hashed = {key: hash_entry_key(key) for key in keys}
+        misses = {h for h in hashed.values() if not self._cached((feed_id, h))}
+        known = self._query_known(feed_id, misses) if misses else set()
+        self._remember((feed_id, h) for h in known)
+        return {key for key, h in hashed.items() if h not in misses or h in known}
+
+    def reserve(self, feed_id, keys):
+        """Marca as chaves como vistas só no cache, enquanto a escrita está pendente."""
+        self._remember((feed_id, hash_entry_key(key)) for key in keys)
+
+    def release(self, feed_id, keys):
+        """Desfaz a reserva de chaves cuja escrita foi descartada: voltam a ser novas."""
+        with self._lock:
+            for key in keys:
+                self._cache.pop((feed_id, hash_entry_key(key)), None)
+
+    def mark_seen(self, feed_id, keys):
+        """Grava as chaves como processadas (no banco e no cache)."""
+        hashes = list({hash_entry_key(key) for key in keys})
+        if not hashes:
+            return
+        with metrics.DB_SECONDS.time(operation='mark_seen'), session_scope() as db:
+            stmt = insert_ignore(SeenEntry, db.get_bind().dialect.name)
+            for chunk in _chunks(hashes):
+                db.execute(stmt, [{'feed_id': feed_id, 'entry_hash': h} for h in chunk])
+        self._remember((feed_id, h) for h in hashes)
@@ -0,0 +1,49 @@
+import os
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+import repository
+
+# Eventos aguardando gravação no banco; com o banco fora do ar os mais
+# antigos são descartados (o log do processo continua com todos)
+EVENT_BUFFER_SIZE = 1000
+
+# Dias que os eventos ficam no banco para o painel
+EVENT_RETENTION_DAYS = int(os.getenv('EVENT_RETENTION_DAYS', '7'))
+
+# Intervalo entre limpezas dos eventos antigos
+PRUNE_INTERVAL = timedelta(hours=1)
+
+_pending = deque(maxlen=EVENT_BUFFER_SIZE)
+_flush_lock = threading.Lock()
+_last_prune = None
+
+def record(message, feed_id=None):
+    """Imprime a mensagem no log e a guarda para o painel.
+
+    A gravação no banco fica para o próximo flush(), feito pelo laço do
+    worker junto com o estado dos feeds; quem registra não espera o banco.
+    """
+    print(message, flush=True)
+    _pending.append({'created_at': datetime.utcnow(), 'feed_id': feed_id, 'message': message})
+
+def pending():
+    return len(_pending)
+
+def flush(worker_id=None):
+    """Grava os eventos pendentes em um único INSERT e apaga os antigos."""
+    global _last_prune
+    with _flush_lock:
+        events = []
+        while _pending:
+            events.append(_pending.popleft())
+        try:
+            repository.add_events([{**event, 'worker_id': worker_id} for event in events])
+        except Exception:
+            # Devolve os eventos para a próxima tentativa
+            _pending.extendleft(reversed(events))
+            raise
+        now = datetime.utcnow()
+        if _last_prune is None or now - _last_prune >= PRUNE_INTERVAL:
+            repository.prune_events(now - timedelta(days=EVENT_RETENTION_DAYS))
+            _last_prune = now
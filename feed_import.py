@@ -0,0 +1,178 @@
+import csv
+import io
+import os
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import feedparser
+import fetcher
+import repository
+from feeds import normalize_url
+from models import SINKS, SINK_DATABASE, SINK_SHEETS
+
+# Feeds baixados ao mesmo tempo na validação (o limite por host do fetcher também vale)
+IMPORT_MAX_WORKERS = int(os.getenv('IMPORT_MAX_WORKERS', '32'))
+
+# Situação de cada linha no relatório da importação
+CREATED = 'created'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+UNREACHABLE = 'unreachable'
+
+# Linha lida do arquivo (line é a linha do CSV ou a posição do <outline> no OPML)
+ImportRow = namedtuple('ImportRow', ['line', 'name', 'feed_url', 'sheet_id', 'sink'])
+
+# Resultado de uma linha; feed_id só vem preenchido nas linhas criadas
+ImportResult = namedtuple('ImportResult', ['line', 'name', 'feed_url', 'status', 'message', 'feed_id'])
+
+# Nomes aceitos para as colunas do CSV
+_CSV_COLUMNS = {
+    'name': ('name', 'nome', 'title', 'titulo', 'título'),
+    'feed_url': ('feed_url', 'url', 'xmlurl', 'feed', 'rss'),
+    'sheet_id': ('sheet_id', 'planilha', 'spreadsheet_id'),
+    'sink': ('sink', 'destino'),
+}
+
+def parse_opml(data):
+    """Lê os <outline> com xmlUrl de um OPML (em qualquer nível de pasta)."""
+    root = ET.fromstring(data)
+    rows = []
+    for position, outline in enumerate(root.iter('outline'), start=1):
+        url = outline.get('xmlUrl') or outline.get('xmlurl')
+        if not url:
+            continue
+        name = outline.get('title') or outline.get('text') or ''
+        rows.append(ImportRow(position, name.strip(), url.strip(), '', ''))
+    return rows
+
+def parse_csv(text):
+    """Lê um CSV com cabeçalho (name, feed_url e, opcionais, sheet_id e sink)."""
+    reader = csv.reader(io.StringIO(text))
+    header = [column.strip().lower() for column in next(reader, [])]
+    positions = {}
+    for field, aliases in _CSV_COLUMNS.items():
+        positions[field] = next((header.index(alias) for alias in aliases if alias in header), None)
+    if positions['feed_url'] is None:
+        raise ValueError('O CSV precisa de uma coluna feed_url (ou url).')
+
+    def cell(values, field):
+        index = positions[field]
+        return values[index].strip() if index is not None and index < len(values) else ''
+
+    return [
+        ImportRow(reader.line_num, cell(values, 'name'), cell(values, 'feed_url'),
+                  cell(values, 'sheet_id'), cell(values, 'sink').lower())
+        for values in reader if any(value.strip() for value in values)
+    ]
+
+def parse_file(data, filename=''):
+    """Escolhe o formato pelo nome do arquivo (.opml/.xml) ou pelo conteúdo."""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    if filename.lower().endswith(('.opml', '.xml')) or data.lstrip().startswith('<'):
+        return parse_opml(data)
+    return parse_csv(data)
+
+def check_row(row, default_sheet_id='', default_sink=SINK_SHEETS):
+    """Preenche os valores padrão e retorna (linha, mensagem de erro ou None)."""
+    row = row._replace(sheet_id=row.sheet_id or default_sheet_id or '', sink=row.sink or default_sink)
+    parts = urlsplit(row.feed_url)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return row, 'URL inválida (use http:// ou https://)'
+    if row.sink not in SINKS:
+        return row, f"Destino inválido: {row.sink} (use {', '.join(SINKS)})"
+    if not row.sheet_id and row.sink != SINK_DATABASE:
+        return row, 'Sem ID da planilha'
+    return row, None
+
+# Elementos raiz de RSS 2.0/0.9x, Atom e RSS 1.0 (RDF)
+_FEED_ROOTS = {'rss', 'feed', 'rdf'}
+
+def sniff_feed(body):
+    """Confere se o documento é um feed e retorna o seu título (ou '').
+
+    Lê o XML em fluxo só até o elemento raiz e o primeiro <title>, sem
+    montar as entradas; documentos que não são XML bem-formado passam pelo
+    feedparser, que aceita feeds quebrados. Levanta ValueError se não for
+    um feed RSS/Atom.
+    """
+    try:
+        root = None
+        for event, element in ET.iterparse(io.BytesIO(body), events=('start', 'end')):
+            tag = element.tag.rsplit('}', 1)[-1].lower()
+            if root is None:
+                root = tag
+                if root not in _FEED_ROOTS:
+                    raise ValueError(f'Não é um feed RSS/Atom (elemento raiz <{root}>)')
+            elif event == 'end' and tag == 'title':
+                return (element.text or '').strip()
+        return ''
+    except ET.ParseError:
+        parsed = feedparser.parse(body)
+        if parsed.bozo and not parsed.entries and not parsed.feed.get('title'):
+            raise ValueError(f"Não é um feed RSS/Atom: {parsed.get('bozo_exception', '')}")
+        return parsed.feed.get('title', '')
+
+def validate_url(url):
+    """Baixa o feed e confere o documento; retorna (título, erro ou None)."""
+    try:
+        return sniff_feed(fetcher.download(url).body), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+def import_feeds(rows, default_sheet_id='', default_sink=SINK_SHEETS, validate=True,
+                 max_workers=IMPORT_MAX_WORKERS, dry_run=False):
+    """Valida, deduplica e cadastra os feeds; retorna um ImportResult por linha.
+
+    Uma linha é duplicada quando a mesma URL (normalizada) já grava na mesma
+    planilha, no banco ou em uma linha anterior do arquivo; a mesma URL em
+    outra planilha é um monitor novo. As URLs são validadas em paralelo
+    (até `max_workers` downloads) e as linhas válidas entram em uma única
+    transação.
+    """
+    existing = {(normalize_url(url), sheet_id or '') for url, sheet_id in repository.list_monitors()}
+    results = {}
+    candidates = []
+    for row in rows:
+        row, error = check_row(row, default_sheet_id, default_sink)
+        key = (normalize_url(row.feed_url), row.sheet_id) if error is None else None
+        if error is not None:
+            results[row.line] = ImportResult(row.line, row.name, row.feed_url, INVALID, error, None)
+        elif key in existing:
+            results[row.line] = ImportResult(row.line, row.name, row.feed_url, DUPLICATE, 'Já cadastrado', None)
+        else:
+            existing.add(key)
+            candidates.append(row)
+
+    if validate and candidates:
+        urls = list({row.feed_url for row in candidates})
+        with ThreadPoolExecutor(max_workers=max(min(max_workers, len(urls)), 1)) as executor:
+            checked = dict(zip(urls, executor.map(validate_url, urls)))
+        valid = []
+        for row in candidates:
+            title, error = checked[row.feed_url]
+            if error is not None:
+                results[row.line] = ImportResult(row.line, row.name, row.feed_url, UNREACHABLE, error, None)
+            else:
+                # Sem nome no arquivo, usa o título do próprio feed
+                valid.append(row._replace(name=row.name or title or ''))
+        candidates = valid
+    candidates = [row._replace(name=row.name or urlsplit(row.feed_url).netloc) for row in candidates]
+
+    feed_ids = [None] * len(candidates)
+    if not dry_run:
+        feed_ids = repository.create_feeds([
+            {'name': row.name, 'feed_url': row.feed_url, 'sheet_id': row.sheet_id, 'sink': row.sink}
+            for row in candidates
+        ])
+    for row, feed_id in zip(candidates, feed_ids):
+        results[row.line] = ImportResult(row.line, row.name, row.feed_url, CREATED, '', feed_id)
+    return [results[line] for line in sorted(results)]
+
+def summarize(results):
+    """Quantidade de linhas por situação."""
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    return counts
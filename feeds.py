@@ -0,0 +1,257 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+import fetcher
+from date_utils import entry_timestamp, format_entry_date, format_entry_dates, now_formatted
+
+def fetch_feed(rss_url, etag=None, modified=None):
+    """Baixa e interpreta o feed usando GET condicional (ETag / Last-Modified).
+
+    Retorna None quando o servidor responde 304, ou seja, o feed não mudou
+    desde a última verificação. O download passa pelo pool de conexões do
+    módulo fetcher, com timeouts e limite de tamanho.
+    """
+    return fetcher.fetch(rss_url, etag, modified)
+
+# Por quanto tempo (em segundos) um documento baixado é reaproveitado pelos
+# outros monitores do mesmo feed
+FETCH_SHARE_TTL = int(os.getenv('FETCH_SHARE_TTL', '120'))
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+@lru_cache(maxsize=4096)
+def normalize_url(url):
+    """Forma canônica da URL do feed, para reconhecer o mesmo feed em vários monitores.
+
+    Esquema e host em minúsculas, sem porta padrão e sem fragmento; caminho
+    e query são mantidos como estão.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    if parts.username:
+        host = f'{parts.username}:{parts.password}@{host}' if parts.password else f'{parts.username}@{host}'
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+def _same_version(etag, modified, cached_etag, cached_modified):
+    # O monitor já tem a versão do documento guardado (equivale a um 304)
+    if cached_etag:
+        return etag == cached_etag
+    return bool(cached_modified) and modified == cached_modified
+
+class _Flight:
+    """Busca em andamento, esperada pelos outros monitores da mesma URL."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+class SharedFetcher:
+    """Baixa cada feed uma vez só quando vários monitores usam a mesma URL.
+
+    As chamadas simultâneas para a mesma URL normalizada esperam a que já
+    está em andamento. O resultado só fica guardado (por `ttl` segundos)
+    para URLs com mais de um monitor ativo (ver set_subscribers), e cada
+    monitor o recebe no máximo uma vez: quem baixou não recebe o próprio
+    download de volta, e o documento sai da memória assim que todos os
+    monitores da URL o receberam. Cada monitor continua com o seu ETag:
+    quem já tem a versão guardada recebe None, como em um 304, e os demais
+    recebem o documento para fazer a própria deduplicação. Erros só são
+    repassados a quem estava esperando a mesma busca.
+
+    O horário do download reaproveitado é devolvido para que os monitores
+    do mesmo feed calculem o próximo horário a partir dele e passem a
+    vencer juntos.
+    """
+
+    def __init__(self, ttl=FETCH_SHARE_TTL):
+        self.ttl = ttl
+        self._results = {}  # url -> (monotonic, horário UTC, documento ou None, etag, modified)
+        self._served = {}  # url -> monitores que já receberam o resultado guardado
+        self._subscribers = {}  # url -> quantidade de monitores ativos
+        self._inflight = {}  # url -> _Flight
+        self._lock = threading.Lock()
+
+    def set_subscribers(self, feed_urls):
+        """Informa as URLs dos monitores ativos (uma por monitor)."""
+        counts = {}
+        for url in feed_urls:
+            key = normalize_url(url)
+            counts[key] = counts.get(key, 0) + 1
+        with self._lock:
+            self._subscribers = counts
+            for key in [key for key in self._results if counts.get(key, 0) < 2]:
+                self._forget(key)
+
+    def _forget(self, key):
+        self._results.pop(key, None)
+        self._served.pop(key, None)
+
+    def _lookup(self, key, subscriber, etag, modified):
+        cached = self._results.get(key)
+        if cached is None or time.monotonic() - cached[0] > self.ttl:
+            return None
+        served = self._served[key]
+        if subscriber is not None and subscriber in served:
+            # Já recebeu este download (ou foi quem baixou): baixa de novo
+            return None
+        _, fetched_at, parsed, cached_etag, cached_modified = cached
+        if _same_version(etag, modified, cached_etag, cached_modified):
+            shared = None, fetched_at
+        elif parsed is not None:
+            shared = parsed, fetched_at
+        else:
+            # O guardado é um 304 de outro monitor, com outra versão: precisa baixar
+            return None
+        if subscriber is not None:
+            served.add(subscriber)
+            if len(served) >= self._subscribers.get(key, 0):
+                # Todos os monitores da URL já receberam: libera a memória
+                self._forget(key)
+        return shared
+
+    def _finish(self, key, flight, result=None, subscriber=None):
+        with self._lock:
+            if result is not None:
+                now = result[0]
+                for url in [url for url, cached in self._results.items() if now - cached[0] > self.ttl]:
+                    self._forget(url)
+                if self._subscribers.get(key, 0) > 1:
+                    self._results[key] = result
+                    self._served[key] = {subscriber} if subscriber is not None else set()
+                else:
+                    self._forget(key)
+            del self._inflight[key]
+        flight.done.set()
+
+    def fetch(self, rss_url, etag=None, modified=None, subscriber=None):
+        """Retorna (documento ou None se não mudou, horário do download reaproveitado).
+
+        `subscriber` identifica o monitor (o ID do feed). O horário é None
+        quando esta chamada fez o download.
+        """
+        key = normalize_url(rss_url)
+        while True:
+            with self._lock:
+                shared = self._lookup(key, subscriber, etag, modified)
+                if shared is not None:
+                    return shared
+                flight = self._inflight.get(key)
+                if flight is None:
+                    flight = self._inflight[key] = _Flight()
+                    break
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+
+        try:
+            parsed = fetch_feed(rss_url, etag, modified)
+        except Exception as e:
+            flight.error = e
+            self._finish(key, flight)
+            raise
+        if parsed is None:
+            result = (time.monotonic(), datetime.utcnow(), None, etag, modified)
+        else:
+            result = (time.monotonic(), datetime.utcnow(), parsed, parsed.get('etag'), parsed.get('modified'))
+        self._finish(key, flight, result, subscriber)
+        return parsed, None
+
+def entry_key(entry):
+    """Identificador estável da entrada: o guid, ou o link quando não há guid."""
+    return entry.get('id') or entry.get('link', '')
+
+def entry_uuid(feed_url, key):
+    """UUID determinístico da entrada (uuid5 da URL normalizada do feed + guid/link).
+
+    A mesma entrada gera sempre o mesmo UUID, então uma linha reenviada
+    para a planilha pode ser reconhecida pela coluna UUID.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f'{normalize_url(feed_url)}#{key}'))
+
+def _feed_url(feed, feed_url):
+    # Sem a URL cadastrada, usa a URL de onde o documento foi baixado
+    return feed_url or feed.get('href', '')
+
+def entry_to_row(entry, formatted_date=None, feed_url=''):
+    """Converte uma entrada do feed em uma linha da planilha."""
+    # Data em UTC, a partir das datas já interpretadas pelo feedparser
+    if formatted_date is None:
+        formatted_date = format_entry_date(entry)
+
+    # UUID estável da entrada (o mesmo a cada reenvio)
+    row_uuid = entry_uuid(feed_url, entry_key(entry))
+
+    # Extrai o link do vídeo
+    video_link = entry.get('link', '')
+
+    # Extrai o título
+    title = entry.get('title', '')
+
+    # Tenta extrair o nome do usuário do autor ou do título
+    user = entry.get('author', '')
+    if not user and 'author' in entry:
+        user = entry['author']
+    if not user:
+        # Se não encontrar o autor, deixa em branco
+        user = ''
+
+    row = [
+        formatted_date,
+        row_uuid,
+        video_link,
+        title,
+        user
+    ]
+    return row
+
+def feed_to_rows(feed, feed_url=None):
+    """Converte as entradas de um feed já interpretado em linhas da planilha."""
+    feed_url = _feed_url(feed, feed_url)
+    dates = format_entry_dates(feed.entries)
+    return [entry_to_row(entry, date, feed_url) for entry, date in zip(feed.entries, dates)]
+
+def _newest_first(entries):
+    """Indica se o documento lista as entradas da mais nova para a mais antiga."""
+    first = entry_timestamp(entries[0])
+    last = entry_timestamp(entries[-1])
+    return first is None or last is None or first >= last
+
+def iter_new_entries(feed, seen_keys, feed_url=None):
+    """Gera pares (chave, linha) sob demanda, da entrada mais nova para a mais antiga.
+
+    Para na primeira entrada já vista: as seguintes são mais antigas e já
+    foram processadas, então data, UUID e autor só são montados para as
+    entradas novas. Feeds em ordem cronológica crescente são lidos de trás
+    para frente.
+    """
+    feed_url = _feed_url(feed, feed_url)
+    entries = feed.entries
+    if entries and not _newest_first(entries):
+        entries = reversed(entries)
+
+    now = now_formatted()
+    yielded = set()
+    for entry in entries:
+        key = entry_key(entry)
+        if key in seen_keys:
+            return
+        if key in yielded:
+            continue  # Chave repetida no mesmo documento
+        yielded.add(key)
+        yield key, entry_to_row(entry, format_entry_date(entry, now), feed_url)
+
+def collect_new_entries(feed, feed_id, seen_index, feed_url=None):
+    """Consulta as chaves do documento de uma vez no índice e monta só as linhas novas."""
+    seen_keys = seen_index.seen_keys(feed_id, [entry_key(entry) for entry in feed.entries])
+    return list(iter_new_entries(feed, seen_keys, feed_url))
+
+def process_feed(rss_url):
+    """Baixa o feed completo (sem cache) e retorna as linhas da planilha."""
+    return feed_to_rows(fetch_feed(rss_url), rss_url)
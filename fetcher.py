@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urljoin
+import feedparser
+import urllib3
+
+# Conexões abertas ao mesmo tempo por host; as demais requisições esperam
+FETCH_MAX_PER_HOST = int(os.getenv('FETCH_MAX_PER_HOST', '4'))
+
+# Hosts com conexões mantidas abertas (keep-alive) no pool
+FETCH_MAX_HOSTS = int(os.getenv('FETCH_MAX_HOSTS', '100'))
+
+# Tempo máximo (em segundos) para conectar e entre dois pacotes da resposta
+FETCH_CONNECT_TIMEOUT = float(os.getenv('FETCH_CONNECT_TIMEOUT', '5'))
+FETCH_READ_TIMEOUT = float(os.getenv('FETCH_READ_TIMEOUT', '15'))
+
+# Tempo máximo (em segundos) do download inteiro, contra servidores que
+# mandam o corpo aos poucos sem estourar o timeout de leitura
+FETCH_TOTAL_TIMEOUT = float(os.getenv('FETCH_TOTAL_TIMEOUT', '30'))
+
+# Tamanho máximo do documento já descompactado (em bytes)
+FETCH_MAX_BYTES = int(os.getenv('FETCH_MAX_BYTES', str(10 * 1024 * 1024)))
+
+USER_AGENT = f'feed-rss/1.0 (+feedparser {feedparser.__version__})'
+
+# Tamanho de cada leitura do corpo da resposta
+_CHUNK_SIZE = 64 * 1024
+
+# Cabeçalhos da resposta que não valem para o corpo já descompactado
+_SKIP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+class FetchError(Exception):
+    """Falha ao baixar o feed (status HTTP de erro, corpo grande demais ou lento demais)."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Pool de conexões HTTP do processo, compartilhado por todas as threads.
+
+    Cada host tem no máximo FETCH_MAX_PER_HOST conexões (block=True faz as
+    demais requisições esperarem por uma conexão livre em vez de abrir
+    outras), reaproveitadas entre verificações.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = urllib3.PoolManager(
+                num_pools=FETCH_MAX_HOSTS,
+                maxsize=FETCH_MAX_PER_HOST,
+                block=True,
+                timeout=urllib3.Timeout(connect=FETCH_CONNECT_TIMEOUT, read=FETCH_READ_TIMEOUT),
+                retries=urllib3.Retry(total=None, connect=2, read=0, redirect=5),
+            )
+        return _pool
+
+def _request_headers(etag, modified):
+    # gzip e deflate sempre; br quando o pacote brotli estiver instalado
+    headers = urllib3.make_headers(accept_encoding=True, user_agent=USER_AGENT)
+    headers['Accept'] = 'application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.8'
+    if etag:
+        headers['If-None-Match'] = etag
+    if modified:
+        headers['If-Modified-Since'] = modified
+    return headers
+
+def _read_body(response, url):
+    """Lê o corpo descompactado em blocos, com limite de tamanho e de tempo.
+
+    O download passa de FETCH_TOTAL_TIMEOUT no máximo pelo tempo de uma
+    leitura (FETCH_READ_TIMEOUT).
+    """
+    length = response.headers.get('Content-Length')
+    if not response.headers.get('Content-Encoding') and length and length.isdigit() and int(length) > FETCH_MAX_BYTES:
+        raise FetchError(f'{url}: documento com {length} bytes (limite {FETCH_MAX_BYTES})', response.status)
+    deadline = time.monotonic() + FETCH_TOTAL_TIMEOUT
+    body = bytearray()
+    while True:
+        # read1 volta com o que já chegou (stream() espera juntar o bloco
+        # inteiro): o prazo é conferido a cada pacote, mesmo se o servidor
+        # mandar um byte por vez; cada leitura espera no máximo FETCH_READ_TIMEOUT
+        chunk = response.read1(_CHUNK_SIZE, decode_content=True)
+        if not chunk:
+            break
+        body += chunk
+        if len(body) > FETCH_MAX_BYTES:
+            raise FetchError(f'{url}: documento maior que {FETCH_MAX_BYTES} bytes', response.status)
+        if time.monotonic() > deadline:
+            raise FetchError(f'{url}: download passou de {FETCH_TOTAL_TIMEOUT:.0f}s', response.status)
+    return bytes(body)
+
+# Resposta baixada, antes do parse (body vazio no 304)
+Download = namedtuple('Download', ['status', 'headers', 'body', 'bytes_received', 'url', 'seconds'])
+
+def download(url, etag=None, modified=None):
+    """Baixa o feed com GET condicional (ETag / Last-Modified), sem interpretar.
+
+    Os cabeçalhos vêm em minúsculas e sem os de compressão (o corpo já
+    está descompactado).
+    """
+    started = time.perf_counter()
+    response = get_pool().request(
+        'GET', url, headers=_request_headers(etag, modified), preload_content=False, decode_content=True,
+    )
+    try:
+        if response.status >= 400:
+            raise FetchError(f'{url}: HTTP {response.status}', response.status)
+        body = _read_body(response, url) if response.status != 304 else b''
+        received = response.tell()
+    except BaseException:
+        # Corpo não lido até o fim: a conexão não volta reaproveitável
+        response.close()
+        raise
+    finally:
+        response.release_conn()
+    headers = {key.lower(): value for key, value in response.headers.items() if key.lower() not in _SKIP_HEADERS}
+    # Depois de redirecionamentos, a URL final (response.url pode vir só com o caminho)
+    final_url = urljoin(url, response.url or url)
+    return Download(response.status, headers, body, received, final_url, time.perf_counter() - started)
+
+def fetch(url, etag=None, modified=None):
+    """Baixa e interpreta o feed com GET condicional (ETag / Last-Modified).
+
+    Retorna None quando o servidor responde 304. O documento do feedparser
+    ganha as chaves `bytes_received` (bytes lidos da rede, compactados),
+    `fetch_seconds` (download) e `parse_seconds` (feedparser).
+    """
+    result = download(url, etag, modified)
+    if result.status == 304:
+        return None
+    started = time.perf_counter()
+    parsed = feedparser.parse(result.body, response_headers={'content-location': result.url, **result.headers})
+    parsed['status'] = result.status
+    parsed['href'] = result.url
+    if 'etag' in result.headers:
+        parsed['etag'] = result.headers['etag']
+    if 'last-modified' in result.headers:
+        parsed['modified'] = result.headers['last-modified']
+    parsed['bytes_received'] = result.bytes_received
+    parsed['fetch_seconds'] = result.seconds
+    parsed['parse_seconds'] = time.perf_counter() - started
+    return parsed
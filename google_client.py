@@ -0,0 +1,157 @@
+import base64
+import json
+import os
+import pickle
+import threading
+from datetime import datetime, timedelta
+
+# As bibliotecas do Google são importadas dentro das funções: juntas somam
+# centenas de ms e só são necessárias quando o Sheets é usado de fato
+
+# Escopo necessário para o Google Sheets
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
+TOKEN_FILE = 'token.pickle'
+
+# Antecedência com que o token é renovado antes de expirar
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# Intervalo entre verificações da thread de renovação (em segundos)
+REFRESH_CHECK_INTERVAL = 60
+
+# Timeout das chamadas à API do Google (em segundos)
+HTTP_TIMEOUT = int(os.getenv('GOOGLE_HTTP_TIMEOUT', '60'))
+
+_lock = threading.RLock()
+_credentials = None
+_credentials_from_file = False
+_service = None
+_refresher = None
+_local = threading.local()
+
+def _credentials_from_env():
+    """Lê GOOGLE_CREDENTIALS (JSON direto ou pickle em base64), usado no Railway."""
+    value = os.getenv('GOOGLE_CREDENTIALS')
+    if not value:
+        return None
+    from google.oauth2.credentials import Credentials
+    try:
+        # Tenta primeiro como JSON direto
+        return Credentials.from_authorized_user_info(json.loads(value), SCOPES)
+    except json.JSONDecodeError:
+        try:
+            # Se falhar, tenta como base64
+            creds = pickle.loads(base64.b64decode(value))
+            if isinstance(creds, Credentials):
+                return creds
+        except Exception as e:
+            print(f"Erro ao decodificar credenciais: {str(e)}")
+        raise Exception("Credenciais do Google não encontradas ou inválidas")
+
+def _save_token(creds):
+    with open(TOKEN_FILE, 'wb') as token:
+        pickle.dump(creds, token)
+
+def load_credentials(interactive=False):
+    """Carrega as credenciais do ambiente, do token.pickle ou pelo fluxo OAuth local.
+
+    O fluxo no navegador só é usado com `interactive=True` (app local).
+    """
+    global _credentials_from_file
+    from google.auth.transport.requests import Request
+    creds = _credentials_from_env()
+
+    if creds is None and os.path.exists(TOKEN_FILE):
+        with open(TOKEN_FILE, 'rb') as token:
+            creds = pickle.load(token)
+        _credentials_from_file = True
+
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        elif interactive:
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
+            creds = flow.run_local_server(port=0)
+            _credentials_from_file = True
+        else:
+            raise Exception("Credenciais do Google não encontradas ou inválidas")
+        if _credentials_from_file:
+            _save_token(creds)
+
+    return creds
+
+def refresh_if_needed(creds):
+    """Renova o token se ele expira dentro de REFRESH_MARGIN."""
+    if not creds.refresh_token:
+        return False
+    if creds.expiry is not None and creds.expiry - datetime.utcnow() > REFRESH_MARGIN:
+        return False
+    from google.auth.transport.requests import Request
+    with _lock:
+        creds.refresh(Request())
+        if _credentials_from_file:
+            _save_token(creds)
+    return True
+
+def get_credentials(interactive=False):
+    """Credenciais únicas do processo (carregadas uma vez só)."""
+    global _credentials
+    with _lock:
+        if _credentials is None:
+            _credentials = load_credentials(interactive)
+        return _credentials
+
+def _refresh_loop(stop):
+    while not stop.wait(REFRESH_CHECK_INTERVAL):
+        try:
+            refresh_if_needed(get_credentials())
+        except Exception as e:
+            print(f"Erro ao renovar token do Google: {str(e)}", flush=True)
+
+def start_token_refresher():
+    """Inicia (uma vez por processo) a thread que renova o token antes de expirar."""
+    global _refresher
+    with _lock:
+        if _refresher is None:
+            _refresher = threading.Thread(
+                target=_refresh_loop, args=(threading.Event(),),
+                name='google-token-refresher', daemon=True
+            )
+            _refresher.start()
+    return _refresher
+
+def _thread_http():
+    """Conexão HTTP autenticada da thread atual (httplib2 não é thread-safe)."""
+    http = getattr(_local, 'http', None)
+    if http is None:
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+        http = AuthorizedHttp(get_credentials(), http=httplib2.Http(timeout=HTTP_TIMEOUT))
+        _local.http = http
+    return http
+
+def _build_request(http, *args, **kwargs):
+    # Cada requisição usa a conexão da thread que a executa
+    from googleapiclient.http import HttpRequest
+    return HttpRequest(_thread_http(), *args, **kwargs)
+
+def get_sheets_service(interactive=False):
+    """Service do Sheets único do processo, seguro para uso em várias threads.
+
+    Usa o documento de descoberta estático que vem com a biblioteca, então
+    nenhuma requisição é feita para montar o cliente.
+    """
+    global _service
+    with _lock:
+        if _service is None:
+            from googleapiclient.discovery import build
+            get_credentials(interactive)
+            _service = build(
+                'sheets', 'v4',
+                http=_thread_http(),
+                requestBuilder=_build_request,
+                cache_discovery=False,
+                static_discovery=True,
+            )
+        return _service
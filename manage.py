@@ -0,0 +1,81 @@
+"""Comandos de administração do projeto.
+
+Uso:
+    python manage.py init-db
+    python manage.py import-feeds feeds.opml --sheet-id <ID da planilha>
+    python manage.py import-feeds feeds.csv --dry-run
+    python manage.py index-sheet <ID da planilha> [--feed-id <ID do feed>]
+"""
+import argparse
+import time
+
+def init_db(args):
+    from models import init_db
+    init_db()
+    print("Banco de dados inicializado.", flush=True)
+
+def import_feeds(args):
+    import feed_import
+    with open(args.file, 'rb') as file:
+        rows = feed_import.parse_file(file.read(), args.file)
+    started = time.perf_counter()
+    results = feed_import.import_feeds(
+        rows, args.sheet_id, args.sink, validate=not args.no_validate,
+        max_workers=args.workers or feed_import.IMPORT_MAX_WORKERS, dry_run=args.dry_run,
+    )
+    elapsed = time.perf_counter() - started
+    for result in results:
+        if result.status != feed_import.CREATED or args.verbose:
+            print(f"{result.line:>6}  {result.status:<12} {result.feed_url}  {result.message}", flush=True)
+    counts = ', '.join(f'{status}: {count}' for status, count in sorted(feed_import.summarize(results).items()))
+    action = 'validadas (nada gravado)' if args.dry_run else 'processadas'
+    print(f"{len(results)} linhas {action} em {elapsed:.1f}s ({counts or 'nenhuma'}).", flush=True)
+
+def index_sheet(args):
+    import google_client
+    import repository
+    import search_index
+    import sheet_mirror
+    feed_id = args.feed_id
+    if feed_id is None:
+        # Planilha de um único monitor: as linhas são desse feed
+        owners = [feed.id for feed in repository.list_feeds() if feed.sheet_id == args.sheet_id]
+        feed_id = owners[0] if len(owners) == 1 else None
+    # As linhas chegam pela cópia local da planilha (só o que falta é baixado)
+    sheet_mirror.sync(google_client.get_sheets_service(), args.sheet_id)
+    indexed = 0
+    for rows in sheet_mirror.iter_rows(args.sheet_id):
+        # Linhas sem UUID (por exemplo, inseridas à mão) não têm chave no índice
+        rows = [row for row in rows if row[1]]
+        search_index.index_rows(feed_id, rows)
+        indexed += len(rows)
+    print(f"{indexed} linhas da planilha {args.sheet_id} enviadas para o índice de busca.", flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('init-db', help='cria as tabelas e as colunas novas dos modelos')
+    command.set_defaults(handler=init_db)
+
+    from models import SINKS, SINK_SHEETS
+    command = commands.add_parser('import-feeds', help='cadastra em lote os feeds de um arquivo OPML ou CSV')
+    command.add_argument('file', help='arquivo .opml ou .csv (colunas name, feed_url, sheet_id, sink)')
+    command.add_argument('--sheet-id', default='', help='planilha das linhas sem sheet_id (e de todo o OPML)')
+    command.add_argument('--sink', choices=SINKS, default=SINK_SHEETS, help='destino das linhas sem sink')
+    command.add_argument('--workers', type=int, default=None, help='downloads simultâneos na validação')
+    command.add_argument('--no-validate', action='store_true', help='não baixa os feeds antes de cadastrar')
+    command.add_argument('--dry-run', action='store_true', help='só valida e mostra o relatório')
+    command.add_argument('--verbose', action='store_true', help='lista também as linhas cadastradas')
+    command.set_defaults(handler=import_feeds)
+
+    command = commands.add_parser('index-sheet', help='indexa para a busca as linhas já gravadas em uma planilha')
+    command.add_argument('sheet_id', help='ID da planilha')
+    command.add_argument('--feed-id', default=None, help='feed associado às linhas (padrão: o único monitor da planilha)')
+    command.set_defaults(handler=index_sheet)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + pairs + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Contador monotônico com rótulos, no formato do Prometheus."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((name, labels.get(name, '')) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+class Histogram:
+    """Histograma cumulativo com rótulos, no formato do Prometheus."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # rótulos -> [contagens por bucket, soma, total]
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((name, labels.get(name, '')) for name in self.labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Mede a duração do bloco `with` em segundos."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                for bound, bucket_count in zip(self.buckets, counts):
+                    result.append((f'{self.name}_bucket', key + (('le', _format_value(float(bound))),), bucket_count))
+                result.append((f'{self.name}_bucket', key + (('le', '+Inf'),), count))
+                result.append((f'{self.name}_sum', key, total))
+                result.append((f'{self.name}_count', key, count))
+        return result
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Exporta todas as métricas no formato texto do Prometheus."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+# Métricas por etapa do pipeline (rotuladas pelo ID do feed)
+FETCH_SECONDS = histogram('rss_fetch_seconds', 'Tempo para baixar e interpretar o feed', ['feed'])
+FEED_PARSE_SECONDS = histogram('rss_feed_parse_seconds', 'Tempo do feedparser para interpretar o documento baixado', ['feed'])
+FETCH_BYTES = counter('rss_fetch_bytes_total', 'Bytes recebidos da rede (compactados) dos feeds', ['feed'])
+FETCHES_SHARED = counter('rss_fetch_shared_total', 'Verificações atendidas pelo download de outro monitor da mesma URL', ['feed'])
+FETCHES = counter('rss_fetch_total', 'Verificações de feed por resultado (200, 304, error)', ['feed', 'status'])
+PARSE_SECONDS = histogram('rss_parse_seconds', 'Tempo para montar as linhas das entradas novas', ['feed'])
+ENTRIES_SEEN = counter('rss_entries_seen_total', 'Entradas encontradas nos documentos baixados', ['feed'])
+ENTRIES_NEW = counter('rss_entries_new_total', 'Entradas novas enviadas para gravação', ['feed'])
+SHEETS_SECONDS = histogram('sheets_request_seconds', 'Latência das chamadas à API do Sheets', ['operation'])
+SHEETS_ERRORS = counter('sheets_errors_total', 'Erros nas chamadas à API do Sheets', ['operation', 'status'])
+DB_SECONDS = histogram('db_seconds', 'Tempo das operações no banco de dados', ['operation'])
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port, host='0.0.0.0'):
+    """Expõe /metrics em uma thread em segundo plano."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+def parse_metrics(text):
+    """Lê o formato texto do Prometheus em uma lista de (nome, rótulos, valor)."""
+    samples = []
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        match = _SAMPLE.match(line)
+        if not match:
+            continue
+        labels = {key: value.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\')
+                  for key, value in _LABEL.findall(match.group(2) or '')}
+        samples.append((match.group(1), labels, float(match.group(3))))
+    return samples
+
+def summarize(samples):
+    """Resume as amostras por feed e por operação para exibição no painel.
+
+    Retorna (feeds, operations): dicionários com totais e médias em ms.
+    """
+    feeds = {}
+    operations = {}
+    for name, labels, value in samples:
+        if 'feed' in labels:
+            row = feeds.setdefault(labels['feed'], {})
+            if name == 'rss_fetch_total':
+                row[f"fetch_{labels.get('status')}"] = row.get(f"fetch_{labels.get('status')}", 0) + value
+            elif name.endswith(('_sum', '_count', '_total')):
+                row[name] = row.get(name, 0) + value
+        elif 'operation' in labels:
+            key = f"{name.split('_')[0]}:{labels['operation']}"
+            row = operations.setdefault(key, {})
+            if name.endswith(('_sum', '_count')) or name == 'sheets_errors_total':
+                row[name] = row.get(name, 0) + value
+
+    def average_ms(row, prefix):
+        count = row.get(f'{prefix}_count', 0)
+        return 1000 * row.get(f'{prefix}_sum', 0) / count if count else 0.0
+
+    feed_summary = {}
+    for feed_id, row in feeds.items():
+        fetches = sum(value for key, value in row.items() if key.startswith('fetch_'))
+        feed_summary[feed_id] = {
+            'fetches': fetches,
+            'not_modified_rate': row.get('fetch_304', 0) / fetches if fetches else 0.0,
+            'errors': row.get('fetch_error', 0),
+            'shared': row.get('rss_fetch_shared_total', 0),
+            'fetch_ms': average_ms(row, 'rss_fetch_seconds'),
+            'feed_parse_ms': average_ms(row, 'rss_feed_parse_seconds'),
+            'parse_ms': average_ms(row, 'rss_parse_seconds'),
+            'bytes': row.get('rss_fetch_bytes_total', 0),
+            'entries_seen': row.get('rss_entries_seen_total', 0),
+            'entries_new': row.get('rss_entries_new_total', 0),
+        }
+
+    operation_summary = {}
+    for key, row in operations.items():
+        prefix = 'sheets_request_seconds' if key.startswith('sheets') else 'db_seconds'
+        operation_summary[key] = {
+            'calls': row.get(f'{prefix}_count', 0),
+            'average_ms': average_ms(row, prefix),
+            'errors': row.get('sheets_errors_total', 0),
+        }
+    return feed_summary, operation_summary
@@ -1,9 +1,11 @@
-from sqlalchemy import create_engine, Column, String, DateTime, ForeignKey, Enum, Text, Boolean
+from sqlalchemy import create_engine, inspect, text, Column, String, DateTime, ForeignKey, Enum, Text, Boolean, Integer, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
+from contextlib import contextmanager
 from datetime import datetime
 import enum
 import os
+import threading
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente
@@ -15,18 +17,32 @@ if DATABASE_URL and DATABASE_URL.startswith('postgresql://'):
     # Converte a URL para o formato do SQLAlchemy
     DATABASE_URL = DATABASE_URL.replace('postgresql://', 'postgresql+psycopg2://')
 
-# Configuração da engine com parâmetros recomendados pelo Neon
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=5,  # número máximo de conexões
-    max_overflow=10,  # conexões adicionais que podem ser criadas além do pool_size
-    pool_timeout=30,  # tempo máximo de espera por uma conexão
-    pool_recycle=1800,  # recicla conexões após 30 minutos
-    pool_pre_ping=True,  # verifica se a conexão está ativa antes de usar
-)
-
-# Criar sessão
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """Engine única do processo, criada na primeira conexão (e não no import)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            # Configuração da engine com parâmetros recomendados pelo Neon
+            _engine = create_engine(
+                DATABASE_URL,
+                pool_size=5,  # número máximo de conexões
+                max_overflow=10,  # conexões adicionais que podem ser criadas além do pool_size
+                pool_timeout=30,  # tempo máximo de espera por uma conexão
+                pool_recycle=1800,  # recicla conexões após 30 minutos
+                pool_pre_ping=True,  # verifica se a conexão está ativa antes de usar
+            )
+        return _engine
+
+# Criar sessão (a engine é associada em cada sessão)
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+def SessionLocal():
+    """Nova sessão ligada à engine do processo."""
+    return _session_factory(bind=get_engine())
+
 Base = declarative_base()
 
 def get_db():
@@ -37,11 +53,41 @@ def get_db():
     finally:
         db.close()
 
+@contextmanager
+def session_scope():
+    """Sessão com commit no final, rollback em caso de erro e fechamento garantido."""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 # Enum para status do YouTube
 class YoutubeStatus(enum.Enum):
     NOT_POSTED = "NOT_POSTED"
     POSTED = "POSTED"
 
+# Destinos das entradas de um feed (coluna RSSFeed.sink)
+SINK_SHEETS = 'sheets'  # só a planilha
+SINK_DATABASE = 'database'  # só as tabelas video/creator
+SINK_BOTH = 'both'
+SINKS = (SINK_SHEETS, SINK_DATABASE, SINK_BOTH)
+
+# Rotação da aba ativa da planilha (coluna RSSFeed.rotation_policy)
+ROTATE_NEVER = 'never'
+ROTATE_MONTHLY = 'monthly'  # uma aba por mês
+ROTATE_ROWS = 'rows'  # aba nova a cada rotation_max_rows linhas
+ROTATIONS = (ROTATE_NEVER, ROTATE_MONTHLY, ROTATE_ROWS)
+
+# Estado do circuito de erros do feed (coluna RSSFeed.breaker_state)
+BREAKER_CLOSED = 'closed'  # verificações normais
+BREAKER_OPEN = 'open'  # erros seguidos: espera o backoff antes de testar de novo
+BREAKER_HALF_OPEN = 'half_open'  # backoff vencido, verificação de teste em andamento
+
 # Modelo RSSFeed
 class RSSFeed(Base):
     __tablename__ = 'rss_feed'
@@ -52,9 +98,39 @@ class RSSFeed(Base):
     sheet_id = Column(String, nullable=False)  # ID da planilha Google Sheets
     is_active = Column(Boolean, default=True)  # Status do monitoramento
     last_check = Column(DateTime, nullable=True)  # Última verificação
+    next_check = Column(DateTime, nullable=True)  # Próxima verificação (intervalo adaptativo)
+    etag = Column(String, nullable=True)  # ETag da última resposta do feed (GET condicional)
+    modified = Column(String, nullable=True)  # Last-Modified da última resposta do feed
+    lease_owner = Column(String, nullable=True)  # Worker que está processando o feed
+    lease_expires_at = Column(DateTime, nullable=True)  # Fim da reserva do worker
+    sink = Column(String, default=SINK_SHEETS, server_default=SINK_SHEETS)  # Destino das entradas
+    rotation_policy = Column(String, default=ROTATE_NEVER, server_default=ROTATE_NEVER)  # Rotação da aba ativa
+    rotation_max_rows = Column(Integer, nullable=True)  # Linhas por aba (rotação por linhas)
+    archive_sheet_id = Column(String, nullable=True)  # Planilha que recebe as abas antigas
+    consecutive_errors = Column(Integer, default=0, server_default='0')  # Verificações seguidas com erro
+    last_error = Column(Text, nullable=True)  # Mensagem do último erro
+    breaker_state = Column(String, default=BREAKER_CLOSED, server_default=BREAKER_CLOSED)  # Circuito de erros
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+# Modelo SeenEntry (índice das entradas já processadas por feed)
+class SeenEntry(Base):
+    __tablename__ = 'seen_entry'
+    
+    feed_id = Column(String, primary_key=True)  # ID do RSSFeed (ou URL do feed no script avulso)
+    entry_hash = Column(String(40), primary_key=True)  # SHA-1 do guid/link da entrada
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Modelo WorkerEvent (atividade recente do worker, exibida no painel)
+class WorkerEvent(Base):
+    __tablename__ = 'worker_event'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Momento do evento (UTC)
+    feed_id = Column(String, nullable=True)  # ID do RSSFeed (None: evento do worker ou da fila de escrita)
+    worker_id = Column(String, nullable=True)
+    message = Column(Text, nullable=False)
+
 # Modelo Creator
 class Creator(Base):
     __tablename__ = 'creator'
@@ -69,7 +145,7 @@ class Video(Base):
     __tablename__ = 'video'
     
     id = Column(String, primary_key=True)
-    video_url = Column(String)
+    video_url = Column(String, unique=True, index=True)  # Índice único ix_video_video_url
     youtube_url = Column(String, nullable=True)  # URL do vídeo no YouTube
     tiktok_id = Column(String, nullable=True)  # Nova coluna para o ID do TikTok
     local_path = Column(String, nullable=True)
@@ -83,10 +159,126 @@ class Video(Base):
     creator_id = Column(String, ForeignKey('creator.id'))
     creator = relationship("Creator", back_populates="videos")
 
+# Modelo Entry (índice local das entradas processadas, para a busca do painel)
+class Entry(Base):
+    __tablename__ = 'entry'
+
+    # Chave numérica: no SQLite é o rowid usado pela tabela FTS5 (não muda no VACUUM)
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(String, nullable=False)  # UUID da entrada (coluna UUID da planilha)
+    # ID do RSSFeed que encontrou a entrada ('' quando indexada sem feed). O
+    # UUID depende só da URL do feed, então monitores que compartilham a URL
+    # têm as mesmas entradas: cada um ganha a sua linha
+    feed_id = Column(String, nullable=False, default='', server_default='', index=True)
+    title = Column(Text, nullable=True)
+    author = Column(String, nullable=True, index=True)
+    link = Column(String, nullable=True)
+    published_at = Column(DateTime, nullable=True)  # Data da entrada (UTC)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('feed_id', 'id', name='uq_entry_feed_id_id'),
+        # Paginação da busca: mais recentes primeiro, com a chave como desempate
+        Index('ix_entry_published_at_seq', 'published_at', 'seq'),
+    )
+
+# INSERT que ignora linhas já existentes
+def insert_ignore(model, dialect_name):
+    """Retorna um INSERT ... ON CONFLICT DO NOTHING para o dialeto informado."""
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model).on_conflict_do_nothing()
+
+# Adicionar colunas novas em tabelas existentes
+def add_missing_columns():
+    """Adiciona às tabelas existentes as colunas novas dos modelos.
+
+    O create_all só cria tabelas que ainda não existem, então colunas
+    adicionadas depois precisam de um ALTER TABLE.
+    """
+    engine = get_engine()
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}'
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                conn.execute(text(ddl))
+
+# Criar índices em tabelas existentes
+def add_missing_indexes():
+    """Cria os índices dos modelos que ainda não existem no banco."""
+    engine = get_engine()
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+# Índice de texto da tabela entry
+def create_search_index():
+    """Cria o índice de texto usado na busca de entradas.
+
+    No PostgreSQL, um índice GIN sobre to_tsvector(título e autor) e um
+    índice de trigramas (pg_trgm) no título para buscas por trecho. No
+    SQLite, uma tabela FTS5 ligada à tabela entry e mantida por triggers.
+    """
+    engine = get_engine()
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_entry_search ON entry USING gin "
+                "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(author, '')))"
+            ))
+        try:
+            with engine.begin() as conn:
+                conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+                conn.execute(text('CREATE INDEX IF NOT EXISTS ix_entry_title_trgm ON entry USING gin (title gin_trgm_ops)'))
+        except Exception as e:
+            # Sem permissão para a extensão: a busca por trecho funciona, só não usa índice
+            print(f"Índice de trigramas não criado: {str(e)}", flush=True)
+    elif engine.dialect.name == 'sqlite':
+        with engine.begin() as conn:
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entry_fts'"
+            )).first()
+            if exists:
+                return
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE entry_fts USING fts5("
+                "title, author, content='entry', content_rowid='seq', tokenize='unicode61 remove_diacritics 2')"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER entry_fts_insert AFTER INSERT ON entry BEGIN "
+                "INSERT INTO entry_fts(rowid, title, author) VALUES (new.seq, new.title, new.author); END"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER entry_fts_delete AFTER DELETE ON entry BEGIN "
+                "INSERT INTO entry_fts(entry_fts, rowid, title, author) VALUES ('delete', old.seq, old.title, old.author); END"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER entry_fts_update AFTER UPDATE ON entry BEGIN "
+                "INSERT INTO entry_fts(entry_fts, rowid, title, author) VALUES ('delete', old.seq, old.title, old.author); "
+                "INSERT INTO entry_fts(rowid, title, author) VALUES (new.seq, new.title, new.author); END"
+            ))
+            # Indexa as linhas que já estavam na tabela
+            conn.execute(text("INSERT INTO entry_fts(entry_fts) VALUES ('rebuild')"))
+
 # Criar tabelas
 def init_db():
-    """Inicializa o banco de dados criando as tabelas."""
-    Base.metadata.create_all(bind=engine)
+    """Inicializa o banco de dados criando as tabelas.
 
-# Chamar init_db() ao importar o módulo
-init_db() 
\ No newline at end of file
+    Não roda mais no import: use `python manage.py init-db` (fase de
+    release do Procfile) depois de alterar os modelos.
+    """
+    Base.metadata.create_all(bind=get_engine())
+    add_missing_columns()
+    add_missing_indexes()
+    create_search_index()
@@ -0,0 +1,273 @@
+import threading
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, insert, or_, update
+from models import session_scope, RSSFeed, SeenEntry, WorkerEvent, SINK_SHEETS, ROTATE_NEVER, BREAKER_CLOSED
+import metrics
+
+# Registro simples de um feed, desacoplado da sessão do SQLAlchemy
+FeedRecord = namedtuple('FeedRecord', [
+    'id', 'name', 'feed_url', 'sheet_id', 'is_active',
+    'last_check', 'next_check', 'etag', 'modified', 'sink',
+    'rotation_policy', 'rotation_max_rows', 'archive_sheet_id',
+    'consecutive_errors', 'last_error', 'breaker_state', 'created_at',
+])
+
+_FEED_COLUMNS = [getattr(RSSFeed, field) for field in FeedRecord._fields]
+
+def _records(rows):
+    return [FeedRecord(*row) for row in rows]
+
+def list_active_feeds():
+    """Retorna os feeds ativos como registros simples."""
+    with metrics.DB_SECONDS.time(operation='list_active_feeds'), session_scope() as db:
+        return _records(db.query(*_FEED_COLUMNS).filter(RSSFeed.is_active == True).all())
+
+def list_feeds():
+    """Retorna todos os feeds, do mais antigo para o mais novo."""
+    with session_scope() as db:
+        return _records(db.query(*_FEED_COLUMNS).order_by(RSSFeed.created_at).all())
+
+def create_feed(name, feed_url, sheet_id, sink=SINK_SHEETS, rotation_policy=ROTATE_NEVER,
+                rotation_max_rows=None, archive_sheet_id=None):
+    """Cadastra um feed ativo e retorna o seu ID."""
+    feed_id = str(uuid.uuid4())
+    with session_scope() as db:
+        db.add(RSSFeed(
+            id=feed_id,
+            name=name,
+            feed_url=feed_url,
+            sheet_id=sheet_id,
+            is_active=True,
+            sink=sink,
+            rotation_policy=rotation_policy,
+            rotation_max_rows=rotation_max_rows,
+            archive_sheet_id=archive_sheet_id,
+            last_check=datetime.utcnow()
+        ))
+    return feed_id
+
+def create_feeds(feeds):
+    """Cadastra vários feeds ativos em uma única transação e retorna os seus IDs.
+
+    `feeds` é uma lista de dicionários com as colunas do RSSFeed (name,
+    feed_url, sheet_id, sink...); todos entram ou nenhum entra.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {'id': str(uuid.uuid4()), 'is_active': True, 'sink': SINK_SHEETS, 'last_check': now,
+         'created_at': now, 'updated_at': now, **feed}
+        for feed in feeds
+    ]
+    if not rows:
+        return []
+    with metrics.DB_SECONDS.time(operation='create_feeds'), session_scope() as db:
+        db.execute(insert(RSSFeed), rows)
+    return [row['id'] for row in rows]
+
+def list_monitors():
+    """Pares (feed_url, sheet_id) de todos os feeds cadastrados."""
+    with session_scope() as db:
+        return db.query(RSSFeed.feed_url, RSSFeed.sheet_id).all()
+
+def _claimable(now):
+    # Feed vencido e sem reserva válida (reservas de workers que caíram expiram)
+    return [
+        RSSFeed.is_active == True,
+        or_(RSSFeed.next_check == None, RSSFeed.next_check <= now),
+        or_(RSSFeed.lease_owner == None, RSSFeed.lease_expires_at == None, RSSFeed.lease_expires_at < now),
+    ]
+
+def claim_due_feeds(owner, limit, lease_seconds, now=None):
+    """Reserva para `owner` até `limit` feeds vencidos e retorna os seus registros.
+
+    No PostgreSQL usa SELECT ... FOR UPDATE SKIP LOCKED, então workers que
+    disputam os mesmos feeds pegam lotes diferentes sem esperar uns pelos
+    outros. Feeds com o circuito de erros aberto ficam para o fim da fila.
+    No SQLite (sem SKIP LOCKED) a escolha e a reserva são um único
+    UPDATE ... WHERE id IN (SELECT ...), atômico porque o SQLite serializa
+    as escritas; depois relê quais feeds ficaram com esta reserva.
+    """
+    if limit <= 0:
+        return []
+    now = now or datetime.utcnow()
+    expires = now + timedelta(seconds=lease_seconds)
+    with metrics.DB_SECONDS.time(operation='claim_feeds'), session_scope() as db:
+        query = (
+            db.query(RSSFeed.id)
+            .filter(*_claimable(now))
+            # Feeds saudáveis primeiro: feeds com o circuito aberto só pegam
+            # a capacidade que sobrar
+            .order_by(
+                case((or_(RSSFeed.breaker_state == None, RSSFeed.breaker_state == BREAKER_CLOSED), 0), else_=1),
+                RSSFeed.next_check.asc().nullsfirst(),
+            )
+            .limit(limit)
+        )
+        lease = {'lease_owner': owner, 'lease_expires_at': expires}
+        if db.get_bind().dialect.name == 'postgresql':
+            feed_ids = [feed_id for feed_id, in query.with_for_update(skip_locked=True)]
+            if not feed_ids:
+                return []
+            db.execute(
+                update(RSSFeed).where(RSSFeed.id.in_(feed_ids)).values(**lease)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            # A subconsulta roda dentro do UPDATE, já com a trava de escrita
+            db.execute(
+                update(RSSFeed).where(RSSFeed.id.in_(query.subquery().select())).values(**lease)
+                .execution_options(synchronize_session=False)
+            )
+            feed_ids = [
+                feed_id for feed_id, in db.query(RSSFeed.id).filter(
+                    RSSFeed.lease_owner == owner, RSSFeed.lease_expires_at == expires
+                )
+            ]
+        return _records(db.query(*_FEED_COLUMNS).filter(RSSFeed.id.in_(feed_ids)).all())
+
+def renew_leases(owner, feed_ids, lease_seconds):
+    """Estende as reservas de `owner`; retorna os IDs que ainda são dele."""
+    feed_ids = list(feed_ids)
+    if not feed_ids:
+        return set()
+    with session_scope() as db:
+        db.execute(
+            update(RSSFeed)
+            .where(RSSFeed.id.in_(feed_ids), RSSFeed.lease_owner == owner)
+            .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        return {
+            feed_id for feed_id, in
+            db.query(RSSFeed.id).filter(RSSFeed.id.in_(feed_ids), RSSFeed.lease_owner == owner)
+        }
+
+def release_leases(owner, feed_ids):
+    """Libera as reservas de `owner` para que outros workers possam pegar os feeds."""
+    feed_ids = list(feed_ids)
+    if not feed_ids:
+        return
+    with session_scope() as db:
+        db.execute(
+            update(RSSFeed)
+            .where(RSSFeed.id.in_(feed_ids), RSSFeed.lease_owner == owner)
+            .values(lease_owner=None, lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+def reactivate_feed(feed_id):
+    """Reativa um feed (por exemplo, desativado por erros seguidos) e zera o circuito."""
+    with session_scope() as db:
+        db.execute(
+            update(RSSFeed)
+            .where(RSSFeed.id == feed_id)
+            .values(is_active=True, consecutive_errors=0, breaker_state=BREAKER_CLOSED, next_check=None)
+            .execution_options(synchronize_session=False)
+        )
+
+def count_seen_entries():
+    """Quantidade de entradas já gravadas por feed."""
+    with session_scope() as db:
+        return dict(db.query(SeenEntry.feed_id, func.count()).group_by(SeenEntry.feed_id).all())
+
+# Evento do worker lido para o painel
+EventRecord = namedtuple('EventRecord', ['created_at', 'feed_id', 'worker_id', 'message'])
+
+def add_events(events):
+    """Grava vários eventos do worker (dicionários com as colunas do WorkerEvent)."""
+    if not events:
+        return
+    with metrics.DB_SECONDS.time(operation='add_events'), session_scope() as db:
+        db.execute(insert(WorkerEvent), events)
+
+def recent_events(limit=50):
+    """Eventos mais recentes do worker, do mais novo para o mais antigo."""
+    with session_scope() as db:
+        return [
+            EventRecord(*row) for row in
+            db.query(WorkerEvent.created_at, WorkerEvent.feed_id, WorkerEvent.worker_id, WorkerEvent.message)
+            .order_by(WorkerEvent.created_at.desc(), WorkerEvent.id.desc())
+            .limit(limit)
+        ]
+
+def prune_events(before):
+    """Apaga os eventos anteriores a `before` e retorna quantos foram apagados."""
+    with session_scope() as db:
+        return db.query(WorkerEvent).filter(WorkerEvent.created_at < before).delete(synchronize_session=False)
+
+def _mark_checked(db, feed_ids, when=None):
+    if feed_ids:
+        db.execute(
+            update(RSSFeed)
+            .where(RSSFeed.id.in_(feed_ids))
+            .values(last_check=when or datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+def _update_feeds(db, values_by_id):
+    # Feeds com o mesmo conjunto de colunas vão no mesmo executemany
+    groups = {}
+    for feed_id, values in values_by_id.items():
+        groups.setdefault(tuple(sorted(values)), []).append({'id': feed_id, **values})
+    for params in groups.values():
+        db.execute(update(RSSFeed), params)
+
+def mark_checked(feed_ids, when=None):
+    """Atualiza o last_check de vários feeds com um único UPDATE ... WHERE id IN (...)."""
+    feed_ids = list(feed_ids)
+    if not feed_ids:
+        return
+    with session_scope() as db:
+        _mark_checked(db, feed_ids, when)
+
+def update_feeds(values_by_id):
+    """Atualiza colunas diferentes por feed em lote (UPDATE por chave primária)."""
+    if not values_by_id:
+        return
+    with session_scope() as db:
+        _update_feeds(db, values_by_id)
+
+class FeedUpdateBatch:
+    """Acumula as atualizações dos feeds verificados para gravar tudo de uma vez.
+
+    As threads do worker registram o resultado de cada verificação e o laço
+    principal grava o lote em uma única transação: um UPDATE do last_check
+    para todos os feeds verificados e um executemany para as demais colunas.
+    """
+
+    def __init__(self):
+        self._checked = set()
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._checked | set(self._values))
+
+    def record(self, feed_id, checked=True, **values):
+        with self._lock:
+            if checked:
+                self._checked.add(feed_id)
+            if values:
+                self._values.setdefault(feed_id, {}).update(values)
+
+    def flush(self):
+        with self._lock:
+            checked, self._checked = self._checked, set()
+            values, self._values = self._values, {}
+        if not checked and not values:
+            return
+        try:
+            # Mesma sessão: os dois UPDATEs entram no mesmo commit, ou nenhum entra
+            with metrics.DB_SECONDS.time(operation='feed_updates'), session_scope() as db:
+                _mark_checked(db, list(checked))
+                _update_feeds(db, values)
+        except Exception:
+            # Devolve o lote para a próxima tentativa sem sobrescrever valores mais novos
+            with self._lock:
+                self._checked |= checked
+                for feed_id, feed_values in values.items():
+                    self._values[feed_id] = {**feed_values, **self._values.get(feed_id, {})}
+            raise
@@ -1,131 +1,25 @@
-import feedparser
-import os.path
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-import pickle
 import time
-from datetime import datetime
-import uuid
 import os
-import json
-import base64
-
-# Escopo necessário para o Google Sheets
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+import google_client
+from feeds import fetch_feed, collect_new_entries
+from circuit_breaker import backoff_delay
+from dedup import SeenEntryIndex
+from sheets_sink import append_rows
 
 def get_google_credentials():
-    creds = None
-    
-    # No Railway, usaremos variáveis de ambiente
-    if os.getenv('GOOGLE_CREDENTIALS'):
-        try:
-            # Tenta primeiro como JSON direto
-            creds_dict = json.loads(os.getenv('GOOGLE_CREDENTIALS'))
-            creds = Credentials.from_authorized_user_info(creds_dict, SCOPES)
-        except json.JSONDecodeError:
-            try:
-                # Se falhar, tenta como base64
-                creds_json = base64.b64decode(os.getenv('GOOGLE_CREDENTIALS'))
-                creds_dict = pickle.loads(creds_json)
-                if isinstance(creds_dict, Credentials):
-                    creds = creds_dict
-            except Exception as e:
-                print(f"Erro ao decodificar credenciais: {str(e)}")
-                raise Exception("Credenciais do Google não encontradas ou inválidas")
-    
-    # Se não há credenciais válidas ou estão expiradas
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            raise Exception("Credenciais do Google não encontradas ou inválidas")
-    
-    return creds
+    # No Railway, as credenciais vêm da variável de ambiente GOOGLE_CREDENTIALS
+    return google_client.get_credentials()
 
 def update_sheet(service, spreadsheet_id, values):
     try:
-        # Primeiro, vamos verificar se precisamos adicionar o cabeçalho
-        result = service.spreadsheets().values().get(
-            spreadsheetId=spreadsheet_id,
-            range='A1:E1'
-        ).execute()
-        
-        # Se não houver valores, adiciona o cabeçalho
-        if 'values' not in result:
-            headers = [['DATA', 'UUID', 'VIDEO', 'TITLE', 'USER']]
-            service.spreadsheets().values().append(
-                spreadsheetId=spreadsheet_id,
-                range='A1',
-                valueInputOption='USER_ENTERED',
-                insertDataOption='INSERT_ROWS',
-                body={'values': headers}
-            ).execute()
-
-        # Adiciona os novos valores
-        body = {
-            'values': values
-        }
-        result = service.spreadsheets().values().append(
-            spreadsheetId=spreadsheet_id,
-            range='A2',
-            valueInputOption='USER_ENTERED',
-            insertDataOption='INSERT_ROWS',
-            body=body
-        ).execute()
+        # Cabeçalho (verificado uma vez por planilha), cota e retry ficam no sheets_sink
+        result = append_rows(service, spreadsheet_id, values)
         print(f'Dados adicionados com sucesso!')
         return result
     except Exception as e:
         print(f'Erro ao atualizar planilha: {str(e)}')
         return None
 
-def process_feed(rss_url):
-    # Parse do feed RSS
-    feed = feedparser.parse(rss_url)
-    
-    # Prepara os dados para a planilha
-    entries = []
-    for entry in feed.entries:
-        # Extrai a data e formata
-        published_date = entry.get('published', '')
-        try:
-            if published_date:
-                date_obj = datetime.strptime(published_date, '%a, %d %b %Y %H:%M:%S %z')
-                formatted_date = date_obj.strftime('%Y-%m-%d %H:%M:%S')
-            else:
-                formatted_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        except Exception:
-            formatted_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        # Gera UUID único para cada entrada
-        entry_uuid = str(uuid.uuid4())
-        
-        # Extrai o link do vídeo
-        video_link = entry.get('link', '')
-        
-        # Extrai o título
-        title = entry.get('title', '')
-        
-        # Tenta extrair o nome do usuário do autor ou do título
-        user = entry.get('author', '')
-        if not user and 'author' in entry:
-            user = entry['author']
-        if not user:
-            # Se não encontrar o autor, deixa em branco
-            user = ''
-
-        row = [
-            formatted_date,
-            entry_uuid,
-            video_link,
-            title,
-            user
-        ]
-        entries.append(row)
-    
-    return entries
-
 def main():
     print("Iniciando automação RSS para Google Sheets...")
     
@@ -137,35 +31,56 @@ def main():
         raise Exception("RSS_URL e SPREADSHEET_ID devem ser configurados nas variáveis de ambiente")
     
     print("\nAutenticando com o Google Sheets...")
-    creds = get_google_credentials()
-    service = build('sheets', 'v4', credentials=creds)
+    service = google_client.get_sheets_service()
+    google_client.start_token_refresher()
     
     print("\nMonitorando o feed RSS...")
     print("O script irá verificar novos vídeos a cada 5 minutos.")
-    processed_entries = set()
+    # Índice persistente das entradas já processadas; o script avulso
+    # não tem um RSSFeed, então a própria URL identifica o feed
+    seen_index = SeenEntryIndex()
+    
+    # Validadores de cache HTTP da última resposta (GET condicional)
+    etag = None
+    modified = None
+    
+    # Erros seguidos, para espaçar as tentativas quando o feed cai
+    errors = 0
     
     while True:
         try:
-            entries = process_feed(rss_url)
-            new_entries = []
+            feed = fetch_feed(rss_url, etag, modified)
+            if feed is None:
+                # 304: o feed não mudou, não há nada para processar
+                print(".", end="", flush=True)
+                errors = 0
+                time.sleep(300)
+                continue
             
-            for entry in entries:
-                entry_id = entry[2]  # Usa o link do vídeo como identificador único
-                if entry_id not in processed_entries:
-                    new_entries.append(entry)
-                    processed_entries.add(entry_id)
+            new_entries = collect_new_entries(feed, rss_url, seen_index, rss_url)
+            written = True
             
             if new_entries:
                 print(f"\nEncontrados {len(new_entries)} novos itens!")
-                update_sheet(service, spreadsheet_id, new_entries)
+                written = update_sheet(service, spreadsheet_id, [row for _, row in new_entries]) is not None
             else:
                 print(".", end="", flush=True)  # Indica que o script está rodando
             
+            # Só avança quando a escrita deu certo; senão os itens são reenviados
+            if written:
+                seen_index.mark_seen(rss_url, [key for key, _ in new_entries])
+                etag = feed.get('etag')
+                modified = feed.get('modified')
+            
+            errors = 0
             time.sleep(300)  # Verifica a cada 5 minutos
             
         except Exception as e:
-            print(f"\nErro durante a execução: {str(e)}")
-            time.sleep(60)  # Espera 1 minuto em caso de erro
+            errors += 1
+            delay = backoff_delay(errors)
+            print(f"\nErro durante a execução ({errors} seguidos): {str(e)}")
+            print(f"Nova tentativa em {delay:.0f}s.")
+            time.sleep(delay)  # Backoff exponencial com jitter
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,153 @@
+import calendar
+import heapq
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from date_utils import entry_timestamp
+
+# Intervalo usado quando ainda não há histórico do feed (em segundos)
+DEFAULT_POLL_INTERVAL = int(os.getenv('POLL_INTERVAL', '300'))
+
+# Limites do intervalo adaptativo (em segundos)
+MIN_POLL_INTERVAL = int(os.getenv('MIN_POLL_INTERVAL', '120'))
+MAX_POLL_INTERVAL = int(os.getenv('MAX_POLL_INTERVAL', '21600'))
+
+# Espera antes de tentar de novo um feed que deu erro (em segundos)
+ERROR_RETRY_INTERVAL = int(os.getenv('ERROR_RETRY_INTERVAL', '60'))
+
+# Fator de espaçamento quando o feed não mudou (304)
+UNCHANGED_BACKOFF = 1.5
+
+# Quantas publicações recentes entram no cálculo da taxa
+HISTORY_SIZE = 10
+
+_SY_PERIODS = {
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 7 * 86400,
+    'monthly': 30 * 86400,
+    'yearly': 365 * 86400,
+}
+_MAX_AGE = re.compile(r'(?:s-)?max-age\s*=\s*(\d+)')
+
+def publish_interval(parsed):
+    """Intervalo mediano entre as publicações recentes do feed (segundos) ou None."""
+    timestamps = sorted(
+        calendar.timegm(ts) for ts in (entry_timestamp(entry) for entry in parsed.entries) if ts
+    )[-HISTORY_SIZE:]
+    gaps = sorted(b - a for a, b in zip(timestamps, timestamps[1:]) if b > a)
+    if not gaps:
+        return None
+    return gaps[len(gaps) // 2]
+
+def last_publish_age(parsed):
+    """Segundos desde a publicação mais recente do feed, ou None."""
+    timestamps = [ts for ts in (entry_timestamp(entry) for entry in parsed.entries) if ts]
+    if not timestamps:
+        return None
+    return max(time.time() - calendar.timegm(max(timestamps)), 0)
+
+def declared_interval(parsed):
+    """Menor intervalo de verificação pedido pelo servidor ou pelo próprio feed.
+
+    Considera o Cache-Control da resposta, o <ttl> do RSS (em minutos) e
+    sy:updatePeriod/sy:updateFrequency. Retorna None se nada foi declarado.
+    """
+    hints = []
+    headers = {key.lower(): value for key, value in parsed.get('headers', {}).items()}
+    match = _MAX_AGE.search(headers.get('cache-control', ''))
+    if match:
+        hints.append(int(match.group(1)))
+
+    channel = parsed.get('feed', {})
+    try:
+        hints.append(int(channel.get('ttl')) * 60)
+    except (TypeError, ValueError):
+        pass
+
+    period = _SY_PERIODS.get(str(channel.get('sy_updateperiod', '')).strip().lower())
+    if period:
+        try:
+            frequency = max(int(channel.get('sy_updatefrequency', 1)), 1)
+        except (TypeError, ValueError):
+            frequency = 1
+        hints.append(period // frequency)
+
+    return max(hints) if hints else None
+
+def next_interval(parsed, previous_interval=None):
+    """Calcula em quantos segundos o feed deve ser verificado de novo.
+
+    `parsed` é None quando o servidor respondeu 304: nesse caso o intervalo
+    anterior é espaçado. Caso contrário, o intervalo acompanha a taxa de
+    publicação observada (duas verificações por publicação esperada),
+    cresce para feeds parados há muito tempo e nunca fica abaixo do que o
+    servidor declarou.
+    """
+    previous_interval = previous_interval or DEFAULT_POLL_INTERVAL
+    if parsed is None:
+        interval = previous_interval * UNCHANGED_BACKOFF
+    else:
+        rate = publish_interval(parsed)
+        interval = rate / 2 if rate else previous_interval
+        age = last_publish_age(parsed)
+        if age is not None:
+            interval = max(interval, age / 4)
+        declared = declared_interval(parsed)
+        if declared:
+            interval = max(interval, declared)
+    return int(min(max(interval, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL))
+
+def previous_interval(feed):
+    """Intervalo usado na última verificação do feed, a partir das colunas do banco."""
+    if feed.last_check and feed.next_check and feed.next_check > feed.last_check:
+        return (feed.next_check - feed.last_check).total_seconds()
+    return None
+
+def next_check_after(seconds, now=None):
+    return (now or datetime.utcnow()) + timedelta(seconds=seconds)
+
+class PollSchedule:
+    """Fila de prioridade (min-heap) com o próximo horário de cada feed.
+
+    Reagendar um feed não remove a entrada antiga do heap; ela é descartada
+    quando chega ao topo, comparando com o horário mais recente do feed.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}  # feed_id -> próximo horário válido
+
+    def __contains__(self, feed_id):
+        return feed_id in self._due
+
+    def __len__(self):
+        return len(self._due)
+
+    def schedule(self, feed_id, when):
+        self._due[feed_id] = when
+        heapq.heappush(self._heap, (when, feed_id))
+
+    def remove(self, feed_id):
+        self._due.pop(feed_id, None)
+
+    def _discard_stale(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """Horário do próximo feed a vencer, ou None se a fila estiver vazia."""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove e retorna os feeds com horário vencido."""
+        due = []
+        self._discard_stale()
+        while self._heap and self._heap[0][0] <= now:
+            when, feed_id = heapq.heappop(self._heap)
+            del self._due[feed_id]
+            due.append(feed_id)
+            self._discard_stale()
+        return due
@@ -0,0 +1,135 @@
+import re
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import func, or_, text
+from date_utils import DATE_FORMAT
+from models import session_scope, Entry, insert_ignore
+import metrics
+
+# Tamanho máximo de cada lote nas inserções
+BATCH_SIZE = 500
+
+# Limite da contagem de resultados: acima disso o painel mostra "mais de"
+COUNT_LIMIT = 10000
+
+# Resultados a partir dos quais a página é montada percorrendo o índice por
+# data em vez de ordenar todos os resultados do FTS5 (SQLite)
+SCAN_BY_DATE_AFTER = 2000
+
+# Entrada devolvida pela busca
+SearchResult = namedtuple('SearchResult', ['published_at', 'title', 'author', 'link', 'feed_id', 'id'])
+
+_TERMS = re.compile(r'\w+', re.UNICODE)
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _published_at(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+def index_rows(feed_id, rows):
+    """Adiciona ao índice as linhas da planilha ([data, uuid, link, título, autor]).
+
+    A chave é (feed, UUID da entrada), então indexar de novo as mesmas
+    linhas não duplica nada e monitores que compartilham a URL do feed
+    ganham cada um a sua cópia.
+    """
+    if not rows:
+        return
+    with metrics.DB_SECONDS.time(operation='index_entries'), session_scope() as db:
+        stmt = insert_ignore(Entry, db.get_bind().dialect.name)
+        for chunk in _chunks(rows):
+            db.execute(stmt, [
+                {
+                    'id': entry_uuid,
+                    'feed_id': feed_id or '',
+                    'title': title,
+                    'author': author or None,
+                    'link': link,
+                    'published_at': _published_at(date),
+                }
+                for date, entry_uuid, link, title, author in chunk
+            ])
+
+def fts_query(query):
+    """Converte o texto digitado em uma consulta FTS5: todos os termos, por prefixo."""
+    return ' '.join(f'"{term}"*' for term in _TERMS.findall(query or ''))
+
+def _text_filter(query, dialect, scan_by_date=False):
+    if dialect == 'postgresql':
+        document = func.to_tsvector('simple', func.coalesce(Entry.title, '') + ' ' + func.coalesce(Entry.author, ''))
+        pattern = '%' + re.sub(r'([%_\\])', r'\\\1', query) + '%'
+        # Palavras inteiras pelo índice GIN; trechos do título pelo índice de trigramas
+        return or_(document.op('@@')(func.websearch_to_tsquery('simple', query)), Entry.title.ilike(pattern))
+    if dialect == 'sqlite':
+        # Com o "+" o SQLite não busca cada resultado do FTS5 pela chave: ele
+        # percorre o índice por data (ou feed), confere se a linha está no
+        # conjunto do FTS5 e para ao completar a página. Compensa quando o
+        # termo é comum; para termos raros, buscar pela chave é mais rápido.
+        column = '+entry.seq' if scan_by_date else 'entry.seq'
+        return text(f'{column} IN (SELECT rowid FROM entry_fts WHERE entry_fts MATCH :fts_query)').bindparams(
+            fts_query=fts_query(query)
+        )
+    return or_(Entry.title.ilike(f'%{query}%'), Entry.author.ilike(f'%{query}%'))
+
+def search(query='', feed_ids=(), author=None, since=None, until=None, page=0, page_size=50):
+    """Busca entradas por texto (título e autor), feed, autor e período.
+
+    Retorna (página de SearchResult, da mais recente para a mais antiga,
+    e o total de entradas encontradas, limitado a COUNT_LIMIT + 1 para que
+    termos muito comuns não paguem a contagem inteira). `since` e `until`
+    são datetimes em UTC (inclusive e exclusive).
+    """
+    with metrics.DB_SECONDS.time(operation='search_entries'), session_scope() as db:
+        dialect = db.get_bind().dialect.name
+        filters = []
+        if feed_ids:
+            filters.append(Entry.feed_id.in_(list(feed_ids)))
+        if author:
+            filters.append(Entry.author == author)
+        if since is not None:
+            filters.append(Entry.published_at >= since)
+        if until is not None:
+            filters.append(Entry.published_at < until)
+        # Sem nenhuma palavra (só pontuação) não há o que buscar no FTS5
+        query = (query or '').strip()
+        if dialect == 'sqlite' and not fts_query(query):
+            query = ''
+
+        # Com filtros de feed, autor ou data, o índice deles limita as linhas
+        # percorridas; só com o texto, conta pelo FTS5 e decide pela contagem
+        text_filters = [_text_filter(query, dialect, scan_by_date=bool(filters))] if query else []
+        matches = db.query(Entry.seq).filter(*filters, *text_filters).limit(COUNT_LIMIT + 1).subquery()
+        total = db.query(func.count()).select_from(matches).scalar()
+
+        if query and not filters and total > SCAN_BY_DATE_AFTER:
+            text_filters = [_text_filter(query, dialect, scan_by_date=True)]
+        rows = (
+            db.query(Entry.published_at, Entry.title, Entry.author, Entry.link, Entry.feed_id, Entry.id)
+            .filter(*filters, *text_filters)
+            .order_by(Entry.published_at.desc(), Entry.seq.desc())
+            .offset(page * page_size)
+            .limit(page_size)
+            .all()
+        )
+        return [SearchResult(*row) for row in rows], total
+
+def top_authors(limit=500):
+    """Autores com mais entradas indexadas, para o filtro do painel."""
+    with session_scope() as db:
+        return [
+            author for author, in
+            db.query(Entry.author)
+            .filter(Entry.author != None)
+            .group_by(Entry.author)
+            .order_by(func.count().desc())
+            .limit(limit)
+        ]
+
+def entry_count():
+    with session_scope() as db:
+        return db.query(func.count(Entry.seq)).scalar()
@@ -0,0 +1,117 @@
+import os
+import sqlite3
+from sheets_sink import HEADERS, execute_with_retry, read_bucket
+
+# Pasta onde ficam as cópias locais das planilhas (um SQLite por planilha)
+SHEET_MIRROR_DIR = os.getenv('SHEET_MIRROR_DIR', os.path.join('.cache', 'sheets'))
+
+COLUMNS = HEADERS[0]
+
+def _connect(spreadsheet_id):
+    os.makedirs(SHEET_MIRROR_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(SHEET_MIRROR_DIR, f'{spreadsheet_id}.sqlite3'))
+    # row_number é a linha na planilha (a linha 1 é o cabeçalho)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS sheet_rows ('
+        'row_number INTEGER PRIMARY KEY, data TEXT, uuid TEXT, video TEXT, title TEXT, user TEXT)'
+    )
+    # Aba ativa espelhada; quando a planilha troca de aba a cópia recomeça
+    conn.execute('CREATE TABLE IF NOT EXISTS sheet_meta (key TEXT PRIMARY KEY, value TEXT)')
+    return conn
+
+def _tab(response_range):
+    """Nome da aba no range da resposta ("'2024-05'!A2:E9" -> "2024-05")."""
+    if '!' not in (response_range or ''):
+        return None
+    title = response_range.rsplit('!', 1)[0]
+    if title.startswith("'"):
+        title = title[1:-1].replace("''", "'")
+    return title
+
+def _last_row(conn):
+    return conn.execute('SELECT COALESCE(MAX(row_number), 1) FROM sheet_rows').fetchone()[0]
+
+def _fetch(service, spreadsheet_id, first_row):
+    return execute_with_retry(service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f'A{first_row}:E'
+    ), bucket=read_bucket)
+
+def sync(service, spreadsheet_id):
+    """Baixa só as linhas depois da última já espelhada e retorna quantas chegaram.
+
+    Sem nome de aba, a leitura usa a primeira aba da planilha, que é a
+    ativa (ver sheet_rotation). Se a aba mudou desde o último sync, a
+    cópia local é descartada e a aba nova é lida desde a linha 2.
+    """
+    conn = _connect(spreadsheet_id)
+    try:
+        last_row = _last_row(conn)
+        result = _fetch(service, spreadsheet_id, last_row + 1)
+        tab = _tab(result.get('range'))
+        stored = conn.execute("SELECT value FROM sheet_meta WHERE key = 'tab'").fetchone()
+        changed = stored is not None and tab is not None and stored[0] != tab
+        if changed and last_row > 1:
+            result = _fetch(service, spreadsheet_id, 2)
+        if changed:
+            last_row = 1
+        values = result.get('values', [])
+        rows = [
+            (last_row + 1 + offset, *(list(row) + [''] * len(COLUMNS))[:len(COLUMNS)])
+            for offset, row in enumerate(values)
+        ]
+        with conn:
+            if changed:
+                conn.execute('DELETE FROM sheet_rows')
+            if tab is not None:
+                conn.execute("INSERT OR REPLACE INTO sheet_meta VALUES ('tab', ?)", (tab,))
+            conn.executemany('INSERT OR REPLACE INTO sheet_rows VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+    finally:
+        conn.close()
+
+def reset(spreadsheet_id):
+    """Descarta a cópia local; o próximo sync baixa a planilha inteira."""
+    conn = _connect(spreadsheet_id)
+    try:
+        with conn:
+            conn.execute('DELETE FROM sheet_rows')
+    finally:
+        conn.close()
+
+def row_count(spreadsheet_id):
+    conn = _connect(spreadsheet_id)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM sheet_rows').fetchone()[0]
+    finally:
+        conn.close()
+
+def iter_rows(spreadsheet_id, batch_size=5000):
+    """Percorre as linhas espelhadas em ordem ([data, uuid, vídeo, título, usuário])."""
+    conn = _connect(spreadsheet_id)
+    try:
+        last_row = 1
+        while True:
+            batch = conn.execute(
+                'SELECT row_number, data, uuid, video, title, user FROM sheet_rows '
+                'WHERE row_number > ? ORDER BY row_number LIMIT ?',
+                (last_row, batch_size)
+            ).fetchall()
+            if not batch:
+                return
+            last_row = batch[-1][0]
+            yield [list(row[1:]) for row in batch]
+    finally:
+        conn.close()
+
+def read_page(spreadsheet_id, page=0, page_size=100):
+    """Retorna uma página de linhas, das mais recentes para as mais antigas."""
+    conn = _connect(spreadsheet_id)
+    try:
+        return conn.execute(
+            'SELECT data, uuid, video, title, user FROM sheet_rows '
+            'ORDER BY row_number DESC LIMIT ? OFFSET ?',
+            (page_size, page * page_size)
+        ).fetchall()
+    finally:
+        conn.close()
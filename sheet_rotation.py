@@ -0,0 +1,141 @@
+import csv
+import gzip
+import os
+import re
+from collections import namedtuple
+import events
+from models import ROTATE_MONTHLY, ROTATE_NEVER, ROTATE_ROWS
+from sheets_sink import HEADERS, execute_with_retry, read_bucket
+
+# Linhas por aba na rotação por linhas, quando o feed não define rotation_max_rows
+SHEET_ROTATION_MAX_ROWS = int(os.getenv('SHEET_ROTATION_MAX_ROWS', '100000'))
+
+# Pasta das abas exportadas quando o feed não tem planilha de arquivo. Deve
+# ficar em um volume persistente (o disco do Railway/Heroku é apagado a cada
+# deploy); vazia, sem planilha de arquivo a aba antiga fica na planilha
+SHEET_ARCHIVE_DIR = os.getenv('SHEET_ARCHIVE_DIR', '')
+
+# Política de rotação de uma planilha, montada a partir do RSSFeed
+Rotation = namedtuple('Rotation', ['policy', 'max_rows', 'archive_sheet_id'])
+
+def from_feed(feed):
+    """Política de rotação do feed, ou None se a aba ativa nunca roda."""
+    policy = getattr(feed, 'rotation_policy', None) or ROTATE_NEVER
+    if policy == ROTATE_NEVER:
+        return None
+    return Rotation(policy, feed.rotation_max_rows or SHEET_ROTATION_MAX_ROWS, feed.archive_sheet_id)
+
+def quote_title(title):
+    """Nome da aba no formato da notação A1 ("'Aba'")."""
+    return "'" + title.replace("'", "''") + "'"
+
+def list_tabs(service, spreadsheet_id):
+    """Propriedades (sheetId, title, index) das abas, na ordem da planilha."""
+    result = execute_with_retry(service.spreadsheets().get(
+        spreadsheetId=spreadsheet_id,
+        fields='sheets.properties(sheetId,title,index)'
+    ), bucket=read_bucket)
+    return sorted((sheet['properties'] for sheet in result.get('sheets', [])), key=lambda p: p.get('index', 0))
+
+def tab_title(rotation, now):
+    """Nome da aba ativa que a política pede para `now`."""
+    if rotation.policy == ROTATE_MONTHLY:
+        return now.strftime('%Y-%m')
+    return now.strftime('%Y-%m-%d %H%M%S')
+
+def needs_rotation(rotation, title, data_rows, now):
+    """Indica se a aba ativa `title`, com `data_rows` linhas de dados, deve ser trocada.
+
+    Com a contagem de linhas desconhecida (None), a rotação por linhas
+    espera a próxima escrita, que já conhece a última linha da aba.
+    """
+    if rotation.policy == ROTATE_MONTHLY:
+        return title != tab_title(rotation, now)
+    if rotation.policy == ROTATE_ROWS:
+        return data_rows is not None and data_rows >= rotation.max_rows
+    return False
+
+def _batch_update(service, spreadsheet_id, requests):
+    return execute_with_retry(service.spreadsheets().batchUpdate(
+        spreadsheetId=spreadsheet_id,
+        body={'requests': requests}
+    ))
+
+def export_tab(service, spreadsheet_id, title):
+    """Salva a aba em SHEET_ARCHIVE_DIR/<planilha>/<aba>.csv.gz e retorna o caminho."""
+    result = execute_with_retry(service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f'{quote_title(title)}!A:E'
+    ), bucket=read_bucket)
+    directory = os.path.join(SHEET_ARCHIVE_DIR, spreadsheet_id)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, re.sub(r'[^\w.-]+', '_', title) + '.csv.gz')
+    with gzip.open(path, 'wt', encoding='utf-8', newline='') as file:
+        csv.writer(file).writerows(result.get('values', []))
+    return path
+
+def copy_tab(service, spreadsheet_id, tab, archive_sheet_id):
+    """Copia a aba para a planilha de arquivo, com o nome "<planilha> <aba>"."""
+    copy = execute_with_retry(service.spreadsheets().sheets().copyTo(
+        spreadsheetId=spreadsheet_id,
+        sheetId=tab['sheetId'],
+        body={'destinationSpreadsheetId': archive_sheet_id}
+    ))
+    try:
+        _batch_update(service, archive_sheet_id, [{'updateSheetProperties': {
+            'properties': {'sheetId': copy['sheetId'], 'title': f"{spreadsheet_id[:8]} {tab['title']}"},
+            'fields': 'title',
+        }}])
+    except Exception as e:
+        # A cópia já foi feita; fica só com o nome padrão ("Cópia de ...")
+        events.record(f"Erro ao renomear a aba arquivada {tab['title']}: {str(e)}")
+
+def rotate(service, spreadsheet_id, rotation, tabs, now):
+    """Cria a nova aba ativa na primeira posição e arquiva a anterior.
+
+    As escritas e leituras sem nome de aba usam a primeira aba da planilha,
+    então a aba nova passa a receber os appends e o espelho local sem
+    mudar mais nada. A aba antiga é copiada para a planilha de arquivo (ou
+    exportada para um .csv.gz em SHEET_ARCHIVE_DIR) e só então apagada; sem
+    nenhum dos dois, ou se o arquivamento falhar, ela fica na planilha,
+    depois da aba ativa. Retorna as propriedades da nova aba ativa.
+    """
+    title = tab_title(rotation, now)
+    old = tabs[0] if tabs else None
+    existing = next((tab for tab in tabs if tab['title'] == title), None)
+    if existing is not None:
+        # A aba já existe (criada antes por outro processo): só a põe na frente
+        _batch_update(service, spreadsheet_id, [{'updateSheetProperties': {
+            'properties': {'sheetId': existing['sheetId'], 'index': 0},
+            'fields': 'index',
+        }}])
+        return existing
+
+    reply = _batch_update(service, spreadsheet_id, [{'addSheet': {'properties': {'title': title, 'index': 0}}}])
+    new_tab = reply['replies'][0]['addSheet']['properties']
+    execute_with_retry(service.spreadsheets().values().update(
+        spreadsheetId=spreadsheet_id,
+        range=f'{quote_title(title)}!A1:E1',
+        valueInputOption='RAW',
+        body={'values': HEADERS}
+    ))
+    events.record(f"Nova aba '{title}' na planilha {spreadsheet_id}.")
+
+    if old is None:
+        return new_tab
+    if not rotation.archive_sheet_id and not SHEET_ARCHIVE_DIR:
+        # A aba é a única cópia do histórico: não apaga sem um arquivo persistente
+        events.record(f"Aba '{old['title']}' mantida na planilha {spreadsheet_id} (sem planilha de arquivo).")
+        return new_tab
+    try:
+        if rotation.archive_sheet_id:
+            copy_tab(service, spreadsheet_id, old, rotation.archive_sheet_id)
+            target = f'planilha {rotation.archive_sheet_id}'
+        else:
+            target = export_tab(service, spreadsheet_id, old['title'])
+        _batch_update(service, spreadsheet_id, [{'deleteSheet': {'sheetId': old['sheetId']}}])
+        events.record(f"Aba '{old['title']}' da planilha {spreadsheet_id} arquivada em {target}.")
+    except Exception as e:
+        events.record(f"Erro ao arquivar a aba '{old['title']}' da planilha {spreadsheet_id}: {str(e)} "
+                      f"(a aba foi mantida)")
+    return new_tab
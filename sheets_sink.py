@@ -0,0 +1,377 @@
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from googleapiclient.errors import HttpError
+import events
+import metrics
+
+HEADERS = [['DATA', 'UUID', 'VIDEO', 'TITLE', 'USER']]
+
+# Cota de escrita da API do Sheets (requisições por minuto por usuário)
+SHEETS_WRITES_PER_MINUTE = int(os.getenv('SHEETS_WRITES_PER_MINUTE', '60'))
+
+# Cota de leitura da API do Sheets (requisições por minuto por usuário)
+SHEETS_READS_PER_MINUTE = int(os.getenv('SHEETS_READS_PER_MINUTE', '60'))
+
+# Intervalo entre descargas da fila de escrita (em segundos)
+SINK_FLUSH_INTERVAL = float(os.getenv('SINK_FLUSH_INTERVAL', '5'))
+
+# Tentativas por requisição antes de devolver o lote para a fila
+SHEETS_MAX_RETRIES = int(os.getenv('SHEETS_MAX_RETRIES', '5'))
+
+# Planilhas gravadas em paralelo pela fila de escrita (uma escrita por planilha)
+SINK_MAX_IN_FLIGHT = int(os.getenv('SINK_MAX_IN_FLIGHT', '4'))
+
+# Espera máxima entre tentativas de uma planilha com falha (em segundos)
+MAX_BACKOFF = 1800
+
+# Status HTTP que indicam falha temporária (cota ou instabilidade)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Limitador de taxa: libera no máximo `rate_per_minute` chamadas por minuto."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(rate_per_minute // 6, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueia até haver uma ficha disponível."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+# Limitadores compartilhados por todas as chamadas do processo
+write_bucket = TokenBucket(SHEETS_WRITES_PER_MINUTE)
+read_bucket = TokenBucket(SHEETS_READS_PER_MINUTE)
+
+def is_retryable(error):
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUS
+    return isinstance(error, OSError)  # Timeout ou conexão interrompida
+
+def execute_with_retry(request, retries=SHEETS_MAX_RETRIES, bucket=write_bucket, before_retry=None):
+    """Executa uma requisição da API respeitando a cota e com backoff exponencial.
+
+    `before_retry`, se informado, é chamado antes de cada nova tentativa e
+    retorna a requisição a repetir, ou None quando não há mais nada a fazer
+    (nesse caso a função retorna None).
+    """
+    operation = getattr(request, 'methodId', None) or 'unknown'
+    operation = operation.rsplit('.', 1)[-1]
+    for attempt in range(retries + 1):
+        if attempt and before_retry is not None:
+            request = before_retry()
+            if request is None:
+                return None
+        bucket.acquire()
+        try:
+            with metrics.SHEETS_SECONDS.time(operation=operation):
+                return request.execute()
+        except Exception as e:
+            status = e.resp.status if isinstance(e, HttpError) else type(e).__name__
+            metrics.SHEETS_ERRORS.inc(operation=operation, status=status)
+            if attempt == retries or not is_retryable(e):
+                raise
+            time.sleep(min(2 ** attempt, 60) + random.uniform(0, 1))
+
+# Planilhas que já têm cabeçalho, para não consultar A1:E1 a cada escrita
+_headers_checked = set()
+_headers_lock = threading.Lock()
+
+def ensure_headers(service, spreadsheet_id):
+    """Adiciona o cabeçalho na planilha caso ela ainda esteja vazia."""
+    with _headers_lock:
+        if spreadsheet_id in _headers_checked:
+            return
+
+    result = execute_with_retry(service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range='A1:E1'
+    ), bucket=read_bucket)
+    if 'values' not in result:
+        # update em A1:E1 (e não append): repetir depois de uma resposta
+        # perdida grava a mesma célula, sem uma segunda linha de cabeçalho
+        execute_with_retry(service.spreadsheets().values().update(
+            spreadsheetId=spreadsheet_id,
+            range='A1:E1',
+            valueInputOption='RAW',
+            body={'values': HEADERS}
+        ))
+
+    with _headers_lock:
+        _headers_checked.add(spreadsheet_id)
+
+_LAST_ROW = re.compile(r'(\d+)$')
+
+def _last_row(updated_range):
+    """Última linha de um intervalo como "'Página1'!A5:E7" (7)."""
+    match = _LAST_ROW.search(updated_range or '')
+    return int(match.group(1)) if match else None
+
+def written_ids(service, spreadsheet_id, after_row=1):
+    """UUIDs (coluna B) gravados depois de `after_row` e a última linha com dados."""
+    result = execute_with_retry(service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f'B{after_row + 1}:B'
+    ), bucket=read_bucket)
+    values = result.get('values', [])
+    return {row[0] for row in values if row}, after_row + len(values)
+
+def append_rows(service, spreadsheet_id, values, after_row=None, verify=False):
+    """Grava as linhas no fim da planilha e retorna a última linha gravada.
+
+    As linhas têm UUID determinístico (coluna B), então a escrita pode ser
+    repetida com segurança: antes de cada nova tentativa (e antes da
+    primeira, com `verify=True`) os UUIDs gravados depois de `after_row`, a
+    última linha conhecida, são conferidos e só as linhas que faltam são
+    reenviadas. Um append que deu timeout mas foi aplicado não duplica
+    linhas. Sem `after_row`, a conferência lê a coluna B inteira.
+    """
+    ensure_headers(service, spreadsheet_id)
+    state = {'values': values, 'last_row': None}
+
+    def request():
+        return service.spreadsheets().values().append(
+            spreadsheetId=spreadsheet_id,
+            range='A2',
+            valueInputOption='USER_ENTERED',
+            insertDataOption='INSERT_ROWS',
+            body={'values': state['values']}
+        )
+
+    def reconcile():
+        ids, state['last_row'] = written_ids(service, spreadsheet_id, after_row or 1)
+        state['values'] = [row for row in state['values'] if row[1] not in ids]
+        return request() if state['values'] else None
+
+    first = reconcile() if verify else request()
+    if first is None:
+        return state['last_row']
+    result = execute_with_retry(first, before_retry=reconcile)
+    if result is None:
+        return state['last_row']
+    return _last_row(result.get('updates', {}).get('updatedRange'))
+
+class SheetsSink:
+    """Fila de escrita (write-behind) para o Google Sheets.
+
+    As linhas enfileiradas são agrupadas por planilha e gravadas por uma
+    thread própria em um único append por planilha, de modo que vários
+    feeds apontando para a mesma planilha custam uma chamada à API. Até
+    `max_in_flight` planilhas são gravadas em paralelo (uma escrita por vez
+    em cada planilha, para manter a ordem das linhas), cada uma no seu
+    ritmo: a thread não espera uma planilha terminar para despachar as outras. Um lote que falha
+    por um erro temporário (cota, 5xx, rede) volta para a fila e a planilha
+    espera com backoff exponencial antes da próxima tentativa; um erro
+    permanente (por exemplo, 403 ou 404) descarta o lote e chama o
+    `on_failed` de cada feed, que decide quando enviar de novo. A primeira escrita de
+    cada planilha e a que segue uma falha conferem os UUIDs já gravados
+    (ver append_rows), então reenvios não duplicam linhas. Planilhas com
+    política de rotação (ver sheet_rotation) trocam a aba ativa antes da
+    escrita quando a política pede.
+    """
+
+    def __init__(self, service_factory, flush_interval=SINK_FLUSH_INTERVAL, max_in_flight=SINK_MAX_IN_FLIGHT):
+        self._service_factory = service_factory
+        self.flush_interval = flush_interval
+        self._pending = {}  # spreadsheet_id -> lista de (linhas, on_written, on_failed)
+        self._failures = {}  # spreadsheet_id -> falhas consecutivas
+        self._blocked_until = {}  # spreadsheet_id -> próxima tentativa (monotonic)
+        self._last_row = {}  # spreadsheet_id -> última linha gravada por esta fila
+        self._rotation = {}  # spreadsheet_id -> política de rotação (sheet_rotation.Rotation)
+        self._tabs = {}  # spreadsheet_id -> abas da planilha (a primeira é a ativa)
+        self._in_flight = {}  # spreadsheet_id -> escrita em andamento (Future)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=max(max_in_flight, 1), thread_name_prefix='sheets-sink')
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sheets-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Interrompe a thread e tenta gravar o que ainda está na fila."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush(force=True)
+        self._executor.shutdown()
+
+    def enqueue(self, spreadsheet_id, rows, on_written=None, rotation=None, on_failed=None):
+        """Enfileira linhas; `on_written` é chamado depois que forem gravadas.
+
+        `rotation` é a política de rotação da planilha (None: aba única).
+        `on_failed(erro)` é chamado se a planilha recusar o lote com um erro
+        permanente (as linhas não são gravadas).
+        """
+        with self._lock:
+            self._pending.setdefault(spreadsheet_id, []).append((rows, on_written, on_failed))
+            if rotation is None:
+                self._rotation.pop(spreadsheet_id, None)
+            else:
+                self._rotation[spreadsheet_id] = rotation
+
+    def pending_rows(self):
+        with self._lock:
+            return sum(len(rows) for batches in self._pending.values() for rows, *_ in batches)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush(wait=False)
+            except Exception as e:
+                # As linhas continuam na fila; a thread segue para a próxima descarga
+                events.record(f"Erro na fila de escrita do Sheets: {str(e)}")
+
+    def flush(self, force=False, wait=True):
+        """Dispara a escrita das planilhas com linhas pendentes, um append por planilha.
+
+        Cada planilha tem no máximo uma escrita em andamento (para manter a
+        ordem das linhas), mas as planilhas não esperam umas pelas outras:
+        uma planilha lenta ou em retentativa não segura as demais. A thread
+        da fila chama com `wait=False`; com `wait=True` a chamada espera as
+        escritas em andamento terminarem.
+        """
+        now = time.monotonic()
+        with self._lock:
+            ready = [
+                spreadsheet_id for spreadsheet_id in self._pending
+                if spreadsheet_id not in self._in_flight
+                and (force or self._blocked_until.get(spreadsheet_id, 0) <= now)
+            ]
+        if ready:
+            # Antes de tirar os lotes da fila: se o serviço falhar, nada sai dela
+            service = self._service_factory()
+            with self._lock:
+                for spreadsheet_id in ready:
+                    # Outra chamada de flush pode ter pego a planilha no meio tempo
+                    if spreadsheet_id in self._in_flight or spreadsheet_id not in self._pending:
+                        continue
+                    items = self._pending.pop(spreadsheet_id)
+                    self._in_flight[spreadsheet_id] = self._executor.submit(
+                        self._safe_write, service, spreadsheet_id, items
+                    )
+        if wait:
+            with self._lock:
+                futures = list(self._in_flight.values())
+            for future in futures:
+                future.result()
+
+    def _safe_write(self, service, spreadsheet_id, items):
+        try:
+            self._write(service, spreadsheet_id, items)
+        except Exception as e:
+            self._fail(spreadsheet_id, items, e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(spreadsheet_id, None)
+
+    def _fail(self, spreadsheet_id, items, error):
+        if is_retryable(error):
+            self._requeue(spreadsheet_id, items, error)
+        else:
+            self._discard(spreadsheet_id, items, error)
+
+    def _requeue(self, spreadsheet_id, items, error):
+        """Devolve o lote para o início da fila da planilha, com backoff exponencial."""
+        with self._lock:
+            self._pending[spreadsheet_id] = items + self._pending.get(spreadsheet_id, [])
+            failures = self._failures.get(spreadsheet_id, 0) + 1
+            self._failures[spreadsheet_id] = failures
+            delay = min(self.flush_interval * 2 ** failures, MAX_BACKOFF)
+            self._blocked_until[spreadsheet_id] = time.monotonic() + delay
+        events.record(f"Erro ao atualizar planilha {spreadsheet_id}: {str(error)} "
+                      f"(nova tentativa em {delay:.0f}s)")
+
+    def _discard(self, spreadsheet_id, items, error):
+        """Descarta o lote recusado com erro permanente e avisa os feeds (on_failed)."""
+        values = sum(len(rows) for rows, *_ in items)
+        events.record(f"Erro permanente ao atualizar planilha {spreadsheet_id}: {str(error)} "
+                      f"({values} linhas descartadas)")
+        for _, _, on_failed in items:
+            if on_failed is None:
+                continue
+            try:
+                on_failed(error)
+            except Exception as e:
+                events.record(f"Erro ao registrar a falha na planilha {spreadsheet_id}: {str(e)}")
+
+    def _write(self, service, spreadsheet_id, items):
+        values = [row for rows, *_ in items for row in rows]
+        with self._lock:
+            after_row = self._last_row.get(spreadsheet_id)
+            # Sem última linha conhecida (início do processo ou depois de uma
+            # falha), confere antes se as linhas já estão na planilha
+            verify = after_row is None or spreadsheet_id in self._failures
+            rotation = self._rotation.get(spreadsheet_id)
+        # Com uma falha pendente o lote pode já estar na aba atual: não troca
+        # de aba antes de a reconciliação conferir
+        if rotation is not None and spreadsheet_id not in self._failures:
+            if self._rotate_if_needed(service, spreadsheet_id, rotation, after_row):
+                after_row, verify = 1, False
+        try:
+            last_row = append_rows(service, spreadsheet_id, values, after_row, verify)
+        except Exception as e:
+            self._fail(spreadsheet_id, items, e)
+            return
+
+        with self._lock:
+            self._failures.pop(spreadsheet_id, None)
+            self._blocked_until.pop(spreadsheet_id, None)
+            if last_row is not None:
+                self._last_row[spreadsheet_id] = last_row
+            else:
+                self._last_row.pop(spreadsheet_id, None)
+        events.record(f"{len(values)} linhas adicionadas à planilha {spreadsheet_id}.")
+
+        for _, on_written, _ in items:
+            if on_written is None:
+                continue
+            try:
+                on_written()
+            except Exception as e:
+                events.record(f"Erro ao confirmar escrita na planilha {spreadsheet_id}: {str(e)}")
+
+    def _rotate_if_needed(self, service, spreadsheet_id, rotation, after_row):
+        """Troca a aba ativa se a política pedir; retorna True quando trocou."""
+        # Importado aqui: sheet_rotation depende deste módulo e dos modelos
+        import sheet_rotation
+        try:
+            with self._lock:
+                tabs = self._tabs.get(spreadsheet_id)
+            if tabs is None:
+                tabs = sheet_rotation.list_tabs(service, spreadsheet_id)
+            data_rows = after_row - 1 if after_row is not None else None
+            now = datetime.utcnow()
+            if not sheet_rotation.needs_rotation(rotation, tabs[0]['title'] if tabs else None, data_rows, now):
+                with self._lock:
+                    self._tabs[spreadsheet_id] = tabs
+                return False
+            sheet_rotation.rotate(service, spreadsheet_id, rotation, tabs, now)
+        except Exception as e:
+            # Sem rotação desta vez: a escrita segue na aba atual
+            with self._lock:
+                self._tabs.pop(spreadsheet_id, None)
+            events.record(f"Erro ao trocar a aba da planilha {spreadsheet_id}: {str(e)}")
+            return False
+        with self._lock:
+            # As abas mudaram: a próxima escrita relê a lista
+            self._tabs.pop(spreadsheet_id, None)
+        return True
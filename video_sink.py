@@ -0,0 +1,46 @@
+import uuid
+from models import session_scope, Creator, Video, insert_ignore
+import metrics
+
+# Tamanho máximo de cada lote nas inserções
+BATCH_SIZE = 500
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def store_rows(rows):
+    """Grava as linhas da planilha nas tabelas creator e video.
+
+    Cada linha é [data, uuid, link, título, autor]. Criadores e vídeos são
+    inseridos em lote com INSERT ... ON CONFLICT DO NOTHING (username e
+    video_url são únicos), então gravar de novo as mesmas entradas não
+    duplica nada. Linhas sem link são ignoradas.
+    """
+    rows = [row for row in rows if row[2]]
+    if not rows:
+        return
+    usernames = sorted({row[4] for row in rows if row[4]})
+
+    with metrics.DB_SECONDS.time(operation='store_videos'), session_scope() as db:
+        dialect = db.get_bind().dialect.name
+        creator_ids = {}
+        if usernames:
+            stmt = insert_ignore(Creator, dialect)
+            for chunk in _chunks(usernames):
+                db.execute(stmt, [{'id': str(uuid.uuid4()), 'username': name} for name in chunk])
+                creator_ids.update(
+                    db.query(Creator.username, Creator.id).filter(Creator.username.in_(chunk)).all()
+                )
+
+        stmt = insert_ignore(Video, dialect)
+        for chunk in _chunks(rows):
+            db.execute(stmt, [
+                {
+                    'id': entry_uuid,
+                    'video_url': link,
+                    'title': title,
+                    'creator_id': creator_ids.get(user),
+                }
+                for _, entry_uuid, link, title, user in chunk
+            ])
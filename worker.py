@@ -0,0 +1,341 @@
+import os
+import signal
+import socket
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+import repository
+from feeds import SharedFetcher, collect_new_entries
+from dedup import SeenEntryIndex
+from models import SINK_DATABASE, SINK_SHEETS, BREAKER_HALF_OPEN, BREAKER_OPEN
+import circuit_breaker
+import events
+import google_client
+import metrics
+import search_index
+import sheet_rotation
+import video_sink
+from sheets_sink import SheetsSink
+from scheduler import (
+    PollSchedule, next_interval, previous_interval, next_check_after
+)
+
+# Intervalo para recarregar a lista de feeds ativos do banco (em segundos)
+FEED_REFRESH_INTERVAL = int(os.getenv('FEED_REFRESH_INTERVAL', '30'))
+
+# Porta do endpoint /metrics no formato do Prometheus (0 desativa)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+
+# Intervalo entre gravações em lote do estado dos feeds (em segundos)
+UPDATE_FLUSH_INTERVAL = int(os.getenv('UPDATE_FLUSH_INTERVAL', '5'))
+
+# Número máximo de feeds processados ao mesmo tempo
+MAX_WORKERS = int(os.getenv('WORKER_MAX_WORKERS', '16'))
+
+# Identificação deste processo nas reservas de feeds (várias réplicas do worker
+# dividem a tabela rss_feed)
+WORKER_ID = os.getenv('WORKER_ID') or f'{socket.gethostname()}-{os.getpid()}'
+
+# Duração da reserva de um feed (em segundos); os feeds de um worker que caiu
+# voltam a ficar livres depois desse tempo. A reserva é renovada a cada terço.
+LEASE_SECONDS = int(os.getenv('LEASE_SECONDS', '300'))
+
+# Índice das entradas já gravadas, compartilhado entre as threads
+seen_index = SeenEntryIndex()
+
+# Download único por URL para os monitores que compartilham o mesmo feed
+fetcher = SharedFetcher()
+
+# Resultado das verificações, gravado no banco em lote pelo laço principal
+feed_updates = repository.FeedUpdateBatch()
+
+# Pedido de parada (SIGTERM): o laço principal termina e passa pelo finally
+_stopping = threading.Event()
+
+def _handle_sigterm(signum, frame):
+    # Railway/Heroku param o processo com SIGTERM (e SIGKILL depois de uns
+    # segundos): grava o que está pendente e devolve as reservas antes disso
+    _stopping.set()
+
+# Lotes na fila de escrita por feed; o ETag só avança quando a escrita
+# for confirmada
+_awaiting_write = {}
+_awaiting_lock = threading.Lock()
+
+def poll_feed(sink, feed):
+    """Processa um único feed e retorna o horário da próxima verificação."""
+    with metrics.FETCH_SECONDS.time(feed=feed.id):
+        parsed, shared_at = fetcher.fetch(feed.feed_url, feed.etag, feed.modified, feed.id)
+    # Depois de erros, o intervalo gravado é o do backoff: recomeça do padrão
+    interval = next_interval(parsed, None if feed.consecutive_errors else previous_interval(feed))
+    next_check = next_check_after(interval)
+    if shared_at is not None:
+        # Conta a partir do download compartilhado para vencer junto com os
+        # outros monitores do mesmo feed (sem ficar para antes de meio intervalo)
+        metrics.FETCHES_SHARED.inc(feed=feed.id)
+        next_check = max(next_check_after(interval, shared_at), next_check_after(interval / 2))
+    if parsed is None:
+        # 304: nada mudou, pula parse, deduplicação e escrita
+        metrics.FETCHES.inc(feed=feed.id, status='304')
+        feed_updates.record(feed.id, next_check=next_check)
+        if not _awaiting(feed.id):
+            record_success(feed)
+        return next_check
+
+    metrics.FETCHES.inc(feed=feed.id, status=str(parsed.get('status', 200)))
+    if shared_at is None:
+        metrics.FETCH_BYTES.inc(parsed.get('bytes_received', 0), feed=feed.id)
+        metrics.FEED_PARSE_SECONDS.observe(parsed.get('parse_seconds', 0.0), feed=feed.id)
+    metrics.ENTRIES_SEEN.inc(len(parsed.entries), feed=feed.id)
+    with metrics.PARSE_SECONDS.time(feed=feed.id):
+        new_entries = collect_new_entries(parsed, feed.id, seen_index, feed.feed_url)
+    metrics.ENTRIES_NEW.inc(len(new_entries), feed=feed.id)
+    cache_headers = {'etag': parsed.get('etag'), 'modified': parsed.get('modified')}
+
+    if not new_entries:
+        with _awaiting_lock:
+            pending = _awaiting_write.get(feed.id, 0) > 0
+        if pending:
+            # Quem fecha (ou não) o circuito é a escrita pendente
+            feed_updates.record(feed.id, next_check=next_check)
+        else:
+            feed_updates.record(feed.id, next_check=next_check, **cache_headers)
+            record_success(feed)
+        return next_check
+
+    events.record(f"[{feed.name}] Encontrados {len(new_entries)} novos itens!", feed.id)
+    keys = [key for key, _ in new_entries]
+    rows = [row for _, row in new_entries]
+    sink_name = feed.sink or SINK_SHEETS
+
+    try:
+        # Índice local para a busca do painel; indexar de novo não duplica
+        search_index.index_rows(feed.id, rows)
+    except Exception as e:
+        events.record(f"[{feed.name}] Erro ao indexar entradas para a busca: {str(e)}", feed.id)
+
+    if sink_name != SINK_SHEETS:
+        # Gravação local, sem a cota do Sheets; repetir o lote não duplica vídeos
+        video_sink.store_rows(rows)
+        if sink_name == SINK_DATABASE:
+            seen_index.mark_seen(feed.id, keys)
+            feed_updates.record(feed.id, next_check=next_check, **cache_headers)
+            record_success(feed)
+            return next_check
+
+    def on_written():
+        # Só depois da escrita as chaves vão para o banco e o ETag avança;
+        # se o processo cair antes, o feed é baixado e enviado de novo
+        seen_index.mark_seen(feed.id, keys)
+        feed_updates.record(feed.id, checked=False, **cache_headers)
+        record_success(feed)
+        _write_finished(feed.id)
+
+    def on_failed(error):
+        # Planilha recusou o lote (erro permanente): as entradas voltam a ser
+        # novas, o ETag não avança e o erro conta no circuito do feed, como
+        # um erro de download; a reserva do feed pode ser liberada
+        seen_index.release(feed.id, keys)
+        record_failure(feed, error, 'Erro ao gravar na planilha')
+        _write_finished(feed.id)
+
+    seen_index.reserve(feed.id, keys)
+    with _awaiting_lock:
+        _awaiting_write[feed.id] = _awaiting_write.get(feed.id, 0) + 1
+    sink.enqueue(feed.sheet_id, rows, on_written, sheet_rotation.from_feed(feed), on_failed)
+    feed_updates.record(feed.id, next_check=next_check)
+    return next_check
+
+def _write_finished(feed_id):
+    with _awaiting_lock:
+        _awaiting_write[feed_id] -= 1
+        if not _awaiting_write[feed_id]:
+            del _awaiting_write[feed_id]
+
+def record_failure(feed, error, context='Erro durante a execução'):
+    """Registra o erro no circuito do feed e retorna o horário da nova tentativa."""
+    # Grava a nova tentativa (com backoff) para que nenhum worker pegue o
+    # feed antes da hora
+    values = circuit_breaker.on_failure(feed, error)
+    feed_updates.record(feed.id, checked=False, **values)
+    errors = values['consecutive_errors']
+    events.record(f"[{feed.name}] {context} ({errors} seguidos): {str(error)}", feed.id)
+    if values.get('is_active') is False:
+        events.record(f"[{feed.name}] Feed desativado depois de {errors} erros seguidos.", feed.id)
+    elif values['breaker_state'] == BREAKER_OPEN:
+        events.record(f"[{feed.name}] Circuito aberto; novo teste às {values['next_check']:%H:%M:%S} (UTC).", feed.id)
+    return values['next_check']
+
+def record_success(feed):
+    """Fecha o circuito do feed depois de uma verificação completa.
+
+    Com linhas para a planilha, a verificação só termina quando a escrita
+    é confirmada: um download bem-sucedido seguido de uma escrita recusada
+    conta como erro, não como sucesso.
+    """
+    values = circuit_breaker.on_success(feed)
+    if values:
+        feed_updates.record(feed.id, checked=False, **values)
+        events.record(f"[{feed.name}] Feed voltou a responder; circuito fechado.", feed.id)
+
+def _safe_poll(sink, feed):
+    try:
+        return poll_feed(sink, feed)
+    except Exception as e:
+        metrics.FETCHES.inc(feed=feed.id, status='error')
+        return record_failure(feed, e)
+
+def _awaiting(feed_id):
+    with _awaiting_lock:
+        return _awaiting_write.get(feed_id, 0) > 0
+
+def refresh_feeds(feeds, schedule, running):
+    """Recarrega os feeds ativos: agenda os novos e esquece os desativados."""
+    loaded = {feed.id: feed for feed in repository.list_active_feeds()}
+    # Só as URLs com mais de um monitor guardam o download para os demais
+    fetcher.set_subscribers(feed.feed_url for feed in loaded.values())
+    now = datetime.utcnow()
+
+    for feed_id in list(feeds):
+        if feed_id not in loaded:
+            feeds.pop(feed_id)
+            schedule.remove(feed_id)
+
+    for feed_id, feed in loaded.items():
+        feeds[feed_id] = feed
+        if feed_id not in schedule and feed_id not in running:
+            schedule.schedule(feed_id, feed.next_check or now)
+
+def collect_finished(feeds, schedule, running, done):
+    """Reagenda os feeds cujo processamento terminou."""
+    for feed_id, future in list(running.items()):
+        if future.done():
+            running.pop(feed_id)
+            done.add(feed_id)
+            if feed_id in feeds:
+                schedule.schedule(feed_id, future.result())
+
+def dispatch_due(executor, sink, feeds, schedule, running, held):
+    """Reserva no banco e envia para o pool os feeds com verificação vencida.
+
+    O heap local só indica quando vale a pena consultar o banco: quem decide
+    qual worker processa cada feed é a reserva (lease) em rss_feed.
+    """
+    now = datetime.utcnow()
+    next_due = schedule.next_due()
+    capacity = MAX_WORKERS - len(running)
+    if next_due is None or next_due > now or capacity <= 0:
+        return
+
+    claimed = repository.claim_due_feeds(WORKER_ID, capacity, LEASE_SECONDS, now)
+    for feed in claimed:
+        if circuit_breaker.is_probe(feed):
+            # Backoff vencido: esta verificação decide se o circuito fecha
+            feed_updates.record(feed.id, checked=False, breaker_state=BREAKER_HALF_OPEN)
+        schedule.remove(feed.id)
+        feeds[feed.id] = feed
+        held.add(feed.id)
+        running[feed.id] = executor.submit(_safe_poll, sink, feed)
+    if len(claimed) < capacity:
+        # Os demais feeds vencidos estão com outros workers; voltam ao heap
+        # na próxima recarga, com o next_check gravado por quem os processou
+        schedule.pop_due(now)
+
+def release_finished(done, held):
+    """Libera os feeds já gravados no banco e sem escrita pendente na planilha."""
+    releasable = {feed_id for feed_id in done if not _awaiting(feed_id)}
+    repository.release_leases(WORKER_ID, releasable)
+    done -= releasable
+    held -= releasable
+
+def renew_held(held):
+    lost = held - repository.renew_leases(WORKER_ID, held, LEASE_SECONDS)
+    if lost:
+        events.record(f"{len(lost)} reservas de feeds expiraram e foram assumidas por outro worker.")
+        held -= lost
+
+def main():
+    print(f"Iniciando worker RSS para Google Sheets ({WORKER_ID})...", flush=True)
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
+    print("Autenticando com o Google Sheets...", flush=True)
+    google_client.get_sheets_service()
+    google_client.start_token_refresher()
+
+    if METRICS_PORT:
+        metrics.start_metrics_server(METRICS_PORT)
+        print(f"Métricas disponíveis em http://0.0.0.0:{METRICS_PORT}/metrics", flush=True)
+
+    # Fila de escrita compartilhada por todos os feeds
+    sink = SheetsSink(google_client.get_sheets_service).start()
+
+    feeds = {}  # feed_id -> último estado carregado do banco
+    running = {}  # feed_id -> tarefa em andamento
+    held = set()  # feeds reservados por este worker
+    done = set()  # feeds processados aguardando gravação para liberar a reserva
+    schedule = PollSchedule()
+    last_refresh = None
+    last_flush = time.monotonic()
+    last_renew = time.monotonic()
+    renew_interval = LEASE_SECONDS / 3
+
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            while not _stopping.is_set():
+                if last_refresh is None or time.monotonic() - last_refresh >= FEED_REFRESH_INTERVAL:
+                    try:
+                        refresh_feeds(feeds, schedule, running)
+                    except Exception as e:
+                        events.record(f"Erro ao carregar feeds ativos: {str(e)}")
+                    last_refresh = time.monotonic()
+
+                collect_finished(feeds, schedule, running, done)
+                try:
+                    dispatch_due(executor, sink, feeds, schedule, running, held)
+                except Exception as e:
+                    events.record(f"Erro ao reservar feeds: {str(e)}")
+
+                if time.monotonic() - last_flush >= UPDATE_FLUSH_INTERVAL:
+                    try:
+                        feed_updates.flush()
+                        # A reserva só é liberada depois que o next_check foi gravado
+                        release_finished(done, held)
+                        events.flush(WORKER_ID)
+                    except Exception as e:
+                        events.record(f"Erro ao atualizar feeds no banco: {str(e)}")
+                    last_flush = time.monotonic()
+
+                if time.monotonic() - last_renew >= renew_interval:
+                    try:
+                        renew_held(held)
+                    except Exception as e:
+                        events.record(f"Erro ao renovar reservas de feeds: {str(e)}")
+                    last_renew = time.monotonic()
+
+                # Dorme até o próximo feed vencer, a próxima recarga ou o fim de uma tarefa
+                timeout = FEED_REFRESH_INTERVAL - (time.monotonic() - last_refresh)
+                timeout = min(timeout, renew_interval - (time.monotonic() - last_renew))
+                if len(feed_updates) or done or events.pending():
+                    timeout = min(timeout, UPDATE_FLUSH_INTERVAL - (time.monotonic() - last_flush))
+                next_due = schedule.next_due()
+                if next_due is not None and len(running) < MAX_WORKERS:
+                    timeout = min(timeout, (next_due - datetime.utcnow()).total_seconds())
+                timeout = max(timeout, 0.1)
+                if running:
+                    wait(list(running.values()), timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    _stopping.wait(timeout)
+            events.record("Parada solicitada; gravando a fila e liberando as reservas...")
+    finally:
+        # Grava o que ficou pendente e devolve os feeds para os outros workers
+        try:
+            sink.stop()
+            feed_updates.flush()
+            repository.release_leases(WORKER_ID, held)
+            events.flush(WORKER_ID)
+        except Exception as e:
+            print(f"Erro ao encerrar o worker: {str(e)}", flush=True)
+
+if __name__ == "__main__":
+    main()